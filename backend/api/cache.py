@@ -0,0 +1,203 @@
+import fcntl
+import hashlib
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import transaction
+
+# Пауза между проверками кэша при ожидании чужой пересборки, секунды.
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+
+def get_version(key):
+    """
+    Функция возвращает текущую версию набора данных из кэша.
+    Начальная версия берется из текущего времени, чтобы после
+    вытеснения ключа из кэша не вернуться к уже использованной версии.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """Функция увеличивает версию набора данных, делая кэш устаревшим."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def bump_version_on_commit(key):
+    """
+    Функция увеличивает версию после фиксации текущей транзакции,
+    чтобы параллельный запрос не закэшировал под новой версией
+    еще не зафиксированные данные.
+    """
+    transaction.on_commit(lambda: bump_version(key))
+
+
+def jittered(timeout):
+    """
+    Время жизни со случайным отклонением CACHE_TTL_JITTER,
+    чтобы записи, созданные одновременно, не истекали одновременно.
+    """
+    jitter = settings.CACHE_TTL_JITTER
+    return max(1, round(timeout * random.uniform(1 - jitter, 1 + jitter)))
+
+
+def store_built(backend, key, build, timeout, stale_timeout):
+    value = build()
+    if value is not None:
+        fresh_timeout = jittered(timeout)
+        backend.set(
+            key, (value, time.time() + fresh_timeout),
+            fresh_timeout + stale_timeout
+        )
+    return value
+
+
+def get_lock_path(backend, key):
+    name = hashlib.md5(key.encode()).hexdigest()
+    return os.path.join(backend._dir, 'locks', f'{name}.lock')
+
+
+def acquire_lock(backend, key, timeout):
+    """
+    Неблокирующий захват блокировки key в кэше backend.
+    Возвращает признак блокировки для release_lock() или None.
+    Для FileBasedCache add() не атомарен между процессами, поэтому
+    блокировка - flock файла в каталоге кэша: ее снимает ядро,
+    даже если процесс завершился аварийно. Для остальных бэкендов -
+    cache.add() с временем жизни timeout.
+    """
+    if not isinstance(backend, FileBasedCache):
+        return True if backend.add(key, 1, timeout) else None
+    path = get_lock_path(backend, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_CREAT | os.O_WRONLY, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        # Файл мог быть удален владельцем между open() и flock().
+        if os.fstat(fd).st_ino != os.stat(path).st_ino:
+            raise FileNotFoundError(path)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def release_lock(backend, key, lock):
+    if not isinstance(backend, FileBasedCache):
+        backend.delete(key)
+        return
+    try:
+        os.unlink(get_lock_path(backend, key))
+    finally:
+        os.close(lock)
+
+
+@contextmanager
+def locked(backend, key, timeout, wait=0):
+    """
+    Контекст блокировки key: True, если она захвачена.
+    Занятую блокировку ждет до wait секунд.
+    """
+    deadline = time.monotonic() + wait
+    lock = acquire_lock(backend, key, timeout)
+    while lock is None and time.monotonic() < deadline:
+        time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+        lock = acquire_lock(backend, key, timeout)
+    if lock is None:
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        release_lock(backend, key, lock)
+
+
+def single_flight(key, build, timeout, stale_timeout=0, backend=cache):
+    """
+    Значение из кэша с защитой от одновременной пересборки.
+    При промахе build() вызывает только процесс, захвативший
+    блокировку acquire_lock(<key>:lock); остальные ждут появления значения
+    до SINGLE_FLIGHT_LOCK_TIMEOUT секунд, затем собирают его сами.
+    Запись живет jittered(timeout) секунд и еще stale_timeout секунд
+    отдается устаревшей, пока ее пересобирает один процесс
+    (stale-while-revalidate). Если build() вернул None,
+    значение не кэшируется.
+    Блокировка атомарна в пределах бэкенда: для файлового кэша,
+    memcached и Redis между процессами, для locmem - между потоками
+    одного процесса.
+    """
+    lock_key = f'{key}:lock'
+    lock_timeout = settings.SINGLE_FLIGHT_LOCK_TIMEOUT
+    entry = backend.get(key)
+    if entry is not None:
+        value, fresh_until = entry
+        if time.time() < fresh_until:
+            return value
+        with locked(backend, lock_key, lock_timeout) as acquired:
+            if not acquired:
+                return value
+            return store_built(backend, key, build, timeout, stale_timeout)
+    deadline = time.monotonic() + lock_timeout
+    while True:
+        with locked(backend, lock_key, lock_timeout) as acquired:
+            if acquired:
+                entry = backend.get(key)
+                if entry is not None:
+                    return entry[0]
+                return store_built(
+                    backend, key, build, timeout, stale_timeout
+                )
+        time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+        entry = backend.get(key)
+        if entry is not None:
+            return entry[0]
+        if time.monotonic() > deadline:
+            return build()
+
+
+class ProcessCache:
+    """
+    Кэш данных в памяти процесса.
+    Данные пересобираются функцией build при первом обращении после
+    смены версии в общем кэше Django, поэтому изменение в одном
+    воркере делает устаревшими копии во всех остальных.
+    Новую версию собирает из базы один воркер (single_flight),
+    остальные берут ее из общего кэша.
+    """
+
+    def __init__(self, version_key, build):
+        self.version_key = version_key
+        self.build = build
+        self._lock = threading.Lock()
+        self._version = None
+        self._value = None
+
+    def get(self):
+        version = get_version(self.version_key)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._value = single_flight(
+                        f'{self.version_key}:data:{version}', self.build,
+                        settings.PROCESS_CACHE_SHARED_TIMEOUT
+                    )
+                    self._version = version
+        return self._value
+
+    def invalidate(self):
+        bump_version_on_commit(self.version_key)
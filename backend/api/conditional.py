@@ -0,0 +1,90 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import APIException, ValidationError
+
+
+class NotModified(APIException):
+    """Условный запрос: ответ готов до вызова обработчика."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+def make_etag(*parts):
+    """ETag из версий и отметок времени данных ответа."""
+    signature = ':'.join(str(part) for part in parts)
+    return hashlib.md5(signature.encode()).hexdigest()
+
+
+class ConditionalGetMixin:
+    """
+    Миксин представления: ETag и Last-Modified для GET запросов
+    list и retrieve. Валидаторы вычисляются в initial() после
+    аутентификации и проверки прав; если данные не изменились,
+    сразу возвращается 304 без выборки объектов и сериализации.
+    Представление определяет get_etag_parts() и, если ответ не зависит
+    от пользователя, get_last_modified().
+    """
+
+    conditional_actions = ('list', 'retrieve')
+    validators = None
+
+    def get_etag_parts(self):
+        raise NotImplementedError(
+            'Метод get_etag_parts() должен быть переопределен.'
+        )
+
+    def get_last_modified(self):
+        return None
+
+    def get_validators(self):
+        request = self.request
+        if (request.method not in ('GET', 'HEAD')
+                or self.action not in self.conditional_actions):
+            return None
+        try:
+            parts = self.get_etag_parts()
+        except ValidationError:
+            return None
+        if parts is None:
+            return None
+        etag = quote_etag(make_etag(
+            request.get_full_path(), request.accepted_media_type,
+            request.user.pk, *parts
+        ))
+        last_modified = self.get_last_modified()
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+        return etag, last_modified
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.validators = self.get_validators()
+        if self.validators is None:
+            return
+        etag, last_modified = self.validators
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if self.validators is not None and response.status_code in (200, 304):
+            etag, last_modified = self.validators
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ('Authorization',))
+        return response
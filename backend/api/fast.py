@@ -0,0 +1,61 @@
+from operator import attrgetter
+
+from django.conf import settings
+
+
+class FastSerializer:
+    """
+    Сериализатор только для чтения без механизма полей DRF.
+    Для каждого поля заранее выбирается функция чтения: метод
+    write_<поле>, если он определен, иначе attrgetter по имени поля.
+    Представление объекта собирается одним проходом по ним.
+    Повторяет интерфейс чтения ModelSerializer: instance, many,
+    context и свойство data, поэтому подставляется в get_serializer.
+    Вывод должен совпадать с соответствующим ModelSerializer.
+    """
+
+    fields = ()
+
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        self.writers = self.get_writers()
+
+    def get_writers(self):
+        """Список пар (имя поля, функция чтения значения из объекта)."""
+        return [
+            (name, getattr(self, f'write_{name}', None) or attrgetter(name))
+            for name in self.fields
+        ]
+
+    def to_representation(self, instance):
+        return {name: write(instance) for name, write in self.writers}
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(item) for item in self.instance]
+        return self.to_representation(self.instance)
+
+
+class FastReadMixin:
+    """
+    Миксин представления: для GET запросов list и retrieve
+    get_serializer возвращает fast_serializer_class.
+    Отключается настройкой FAST_SERIALIZERS.
+    """
+
+    fast_serializer_class = None
+
+    def use_fast_serializer(self):
+        return (settings.FAST_SERIALIZERS
+                and self.fast_serializer_class is not None
+                and self.request.method == 'GET'
+                and self.action in ('list', 'retrieve'))
+
+    def get_serializer(self, *args, **kwargs):
+        if not self.use_fast_serializer():
+            return super().get_serializer(*args, **kwargs)
+        kwargs.setdefault('context', self.get_serializer_context())
+        return self.fast_serializer_class(*args, **kwargs)
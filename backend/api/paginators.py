@@ -1,8 +1,191 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+import json
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from api.cache import get_version
+
+MAX_PAGE_SIZE = 100
+
+
+def get_estimated_count(queryset):
+    """
+    Оценка числа строк по плану запроса PostgreSQL (EXPLAIN).
+    Для других СУБД возвращает None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+def count_version_key(table):
+    return f'paginator_count_version:{table}'
+
+
+def get_count_tables(queryset, sql):
+    """Таблицы моделей, упомянутые в SQL запроса, включая подзапросы."""
+    quote_name = connections[queryset.db].ops.quote_name
+    return sorted(
+        model._meta.db_table
+        for model in apps.get_models(include_auto_created=True)
+        if quote_name(model._meta.db_table) in sql
+    )
+
+
+def get_count_cache_key(queryset):
+    """
+    Ключ кэша COUNT: сигнатура запроса и версии его таблиц.
+    Версия таблицы увеличивается при изменении ее строк
+    (см. counted_table_changed в api.signals).
+    """
+    sql, params = queryset.query.sql_with_params()
+    versions = [
+        get_version(count_version_key(table))
+        for table in get_count_tables(queryset, sql)
+    ]
+    signature = f'{queryset.db}:{sql}:{params!r}:{versions!r}'.encode()
+    return f'paginator_count:{hashlib.md5(signature).hexdigest()}'
+
+
+class CountStrategyPaginator(Paginator):
+    """
+    Paginator с дешевым подсчетом общего числа объектов.
+    Небольшие выборки считаются точно через COUNT(*), результат
+    кэшируется по сигнатуре запроса и версиям его таблиц
+    на PAGINATOR_COUNT_CACHE_TIMEOUT.
+    Если оценка планировщика PostgreSQL превышает
+    PAGINATOR_ESTIMATE_THRESHOLD, возвращается оценка без COUNT(*).
+    """
+
+    count_is_estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return super().count
+        try:
+            key = get_count_cache_key(queryset)
+        except EmptyResultSet:
+            return 0
+        count = cache.get(key)
+        if count is not None:
+            return count
+        estimate = get_estimated_count(queryset)
+        if (estimate is not None
+                and estimate > settings.PAGINATOR_ESTIMATE_THRESHOLD):
+            self.count_is_estimated = True
+            return estimate
+        count = queryset.count()
+        cache.set(key, count, settings.PAGINATOR_COUNT_CACHE_TIMEOUT)
+        return count
+
+    def validate_number(self, number):
+        """
+        При оценочном count страницы за его пределами не считаются
+        ошибкой: оценка может быть меньше реального числа объектов.
+        """
+        if not self.count_is_estimated:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть целым числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+
+class KeysetPaginator(CursorPagination):
+    """
+    Курсорная пагинация по ключу сортировки.
+    Страница выбирается условием WHERE по ключу вместо OFFSET,
+    поэтому время ответа не зависит от номера страницы.
+    """
+
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+
+    def __init__(self, ordering):
+        self.ordering = ordering
 
 
 class CustomPaginator(PageNumberPagination):
-    """Пагинатор PageNumberPagination с ограничением limit."""
+    """
+    Пагинатор PageNumberPagination с ограничением limit.
+    Если задан cursor_ordering, запрос с параметром ?pagination=cursor
+    или ?cursor= обслуживается курсорной пагинацией KeysetPaginator.
+    Поле count вычисляется стратегией CountStrategyPaginator.
+    Курсор задается только для сортировки cursor_ordering: запрос
+    с другой сортировкой (?ordering=, релевантность ?search=)
+    отклоняется с ошибкой 400.
+    """
 
+    django_paginator_class = CountStrategyPaginator
     page_size = 6
     page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    cursor_ordering = None
+    cursor_paginator = None
+
+    def is_cursor_requested(self, request):
+        return self.cursor_ordering is not None and (
+            request.query_params.get('pagination') == 'cursor'
+            or 'cursor' in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.is_cursor_requested(request):
+            ordering = tuple(queryset.query.order_by)
+            if ordering and ordering != tuple(self.cursor_ordering):
+                raise ValidationError({
+                    'cursor': 'Курсорная пагинация доступна только '
+                              'для сортировки по умолчанию'
+                })
+            self.cursor_paginator = KeysetPaginator(self.cursor_ordering)
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipePaginator(CustomPaginator):
+    """
+    Пагинатор ленты рецептов, курсор по (pub_date, id).
+    Запрос набора рецептов ?ids= без limit отдается одной страницей.
+    """
+
+    cursor_ordering = ('-pub_date', '-id')
+
+    def get_page_size(self, request):
+        ids = request.query_params.get('ids')
+        if ids and self.page_size_query_param not in request.query_params:
+            return min(len(ids.split(',')), self.max_page_size)
+        return super().get_page_size(request)
+
+
+class SubscriptionPaginator(CustomPaginator):
+    """Пагинатор списка подписок, курсор по id автора."""
+
+    cursor_ordering = ('-id',)
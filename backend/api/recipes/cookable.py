@@ -0,0 +1,302 @@
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Max
+
+from api.cache import bump_version, get_version, locked
+from recipes.models import Recipe, RecipeIngredient
+
+# Счетчик журнала изменений состава рецептов. Запись журнала
+# <ключ>:<номер> хранит список id рецептов, состав которых изменился.
+RECIPE_INGREDIENTS_CHANGES_KEY = 'recipe_ingredients_changes'
+
+EMPTY = numpy.zeros(0, dtype=numpy.int32)
+
+# Допуск сравнения покрытия: 0.3 * 10 = 3.0000000000000004.
+COVERAGE_EPSILON = 1e-9
+
+
+def get_change_key(number):
+    return f'{RECIPE_INGREDIENTS_CHANGES_KEY}:{number}'
+
+
+def record_recipe_changes(recipe_ids):
+    """
+    Добавляет рецепты одной записью в журнал изменений состава
+    после фиксации транзакции: индексы процессов перечитают их из базы.
+    Запись добавляется под блокировкой журнала: сначала запись,
+    затем номер, поэтому номера не повторяются, а читатель
+    не увидит номер раньше записи. Если блокировку не дождались,
+    номер увеличивается без записи - индексы перестроятся.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+
+    def record():
+        lock_timeout = settings.SINGLE_FLIGHT_LOCK_TIMEOUT
+        with locked(
+            cache, f'{RECIPE_INGREDIENTS_CHANGES_KEY}:lock',
+            lock_timeout, wait=lock_timeout
+        ) as acquired:
+            if not acquired:
+                bump_version(RECIPE_INGREDIENTS_CHANGES_KEY)
+                return
+            number = get_version(RECIPE_INGREDIENTS_CHANGES_KEY) + 1
+            cache.set(
+                get_change_key(number), recipe_ids,
+                settings.PROCESS_CACHE_SHARED_TIMEOUT
+            )
+            cache.set(RECIPE_INGREDIENTS_CHANGES_KEY, number, timeout=None)
+    transaction.on_commit(record)
+
+
+def record_recipe_change(recipe_id):
+    record_recipe_changes([recipe_id])
+
+
+def get_recipe_ingredients(recipe_ids):
+    """Словарь {id рецепта: frozenset id ингредиентов} одним запросом."""
+    ingredients = {recipe_id: set() for recipe_id in recipe_ids}
+    rows = RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id')
+    for recipe_id, ingredient_id in rows:
+        ingredients[recipe_id].add(ingredient_id)
+    return {
+        recipe_id: frozenset(ingredient_ids)
+        for recipe_id, ingredient_ids in ingredients.items()
+    }
+
+
+def group_by_ingredient(recipe_ids, ingredient_ids):
+    """Словарь {id ингредиента: массив id рецептов с ним}."""
+    order = numpy.argsort(ingredient_ids, kind='stable')
+    recipe_ids = recipe_ids[order]
+    ingredient_ids = ingredient_ids[order]
+    keys, starts = numpy.unique(ingredient_ids, return_index=True)
+    return dict(zip(keys.tolist(), numpy.split(recipe_ids, starts[1:])))
+
+
+class RankedRecipes:
+    """
+    Результат подбора рецептов для Paginator: len() и срезы.
+    Ключ рецепта - покрытие (с точностью 2**-20), число совпавших
+    ингредиентов и id в одном int64; срез упорядочивается частичной
+    сортировкой argpartition только до своей правой границы.
+    Элементы: (покрытие, число совпавших ингредиентов, id рецепта,
+    число недостающих ингредиентов).
+    """
+
+    def __init__(self, keys, sizes):
+        self.keys = keys
+        self.sizes = sizes
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop, _ = index.indices(len(self.keys))
+        if start >= stop:
+            return []
+        keys = self.keys
+        if stop < len(keys):
+            keys = keys[numpy.argpartition(-keys, stop - 1)[:stop]]
+        keys = numpy.sort(keys)[::-1][start:stop]
+        recipe_ids = (keys & 0xFFFFFFFF).tolist()
+        matched = ((keys >> 32) & 0xFF).tolist()
+        sizes = self.sizes[recipe_ids].tolist()
+        return [
+            (count / size, count, recipe_id, size - count)
+            for recipe_id, count, size in zip(recipe_ids, matched, sizes)
+        ]
+
+
+class IngredientRecipeIndex:
+    """
+    Обратный индекс ингредиент -> рецепты в памяти процесса.
+    Основа строится одним проходом по RecipeIngredient: postings -
+    массивы id рецептов по id ингредиента, sizes - число ингредиентов
+    рецепта по его id. Рецепты, измененные после построения, хранятся
+    в changed с текущим составом и перекрывают основу: их id
+    в changed_ids, их массивы по ингредиентам в changed_postings,
+    их размеры записаны в копию sizes.
+    Перекрытие заменяется целиком (overlay), поэтому поиск в других
+    потоках видит согласованный снимок.
+    """
+
+    def __init__(self, postings, sizes, number):
+        self.postings = postings
+        self.base_sizes = sizes
+        self.changed = {}
+        self.overlay = (EMPTY, {}, sizes)
+        self.number = number
+
+    @classmethod
+    def build(cls, number):
+        """
+        Индекс по состоянию базы не раньше записи журнала number.
+        Рецепты с id больше max_id созданы позже и попадут в индекс
+        из журнала.
+        """
+        max_id = Recipe.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        recipe_ids = array('i')
+        ingredient_ids = array('i')
+        rows = RecipeIngredient.objects.filter(
+            recipe_id__lte=max_id
+        ).order_by().values_list('recipe_id', 'ingredient_id').iterator(
+            chunk_size=10000
+        )
+        for recipe_id, ingredient_id in rows:
+            recipe_ids.append(recipe_id)
+            ingredient_ids.append(ingredient_id)
+        recipe_ids = numpy.frombuffer(recipe_ids, dtype=numpy.int32)
+        ingredient_ids = numpy.frombuffer(ingredient_ids, dtype=numpy.int32)
+        sizes = numpy.bincount(recipe_ids, minlength=max_id + 1)
+        return cls(
+            group_by_ingredient(recipe_ids, ingredient_ids),
+            sizes.astype(numpy.int64), number
+        )
+
+    def apply_changes(self, recipe_ids, number):
+        """Текущий состав рецептов recipe_ids перекрывает основу."""
+        changed = {**self.changed, **get_recipe_ingredients(recipe_ids)}
+        sizes = numpy.zeros(
+            max(len(self.base_sizes), max(changed) + 1), dtype=numpy.int64
+        )
+        sizes[:len(self.base_sizes)] = self.base_sizes
+        pairs = [
+            (recipe_id, ingredient_id)
+            for recipe_id, ingredients in changed.items()
+            for ingredient_id in ingredients
+        ]
+        changed_ids = numpy.fromiter(changed, dtype=numpy.int32)
+        sizes[changed_ids] = [len(changed[pk]) for pk in changed_ids.tolist()]
+        changed_postings = {}
+        if pairs:
+            pairs = numpy.array(pairs, dtype=numpy.int32)
+            changed_postings = group_by_ingredient(pairs[:, 0], pairs[:, 1])
+        self.changed = changed
+        self.overlay = (changed_ids, changed_postings, sizes)
+        self.number = number
+
+    def search(self, ingredients, exclude=frozenset(), min_coverage=0.0):
+        """
+        Рецепты, в которых есть хотя бы один ингредиент из ingredients
+        и нет ингредиентов из exclude, с покрытием не меньше
+        min_coverage по убыванию покрытия, затем числа совпавших
+        ингредиентов и id. Покрытие - доля ингредиентов рецепта,
+        которые есть в ingredients.
+        """
+        changed_ids, changed_postings, sizes = self.overlay
+        included = [
+            self.postings[pk] for pk in ingredients if pk in self.postings
+        ]
+        counts = numpy.bincount(
+            numpy.concatenate(included or [EMPTY]), minlength=len(sizes)
+        )
+        counts[changed_ids] = 0
+        for pk in ingredients:
+            counts[changed_postings.get(pk, EMPTY)] += 1
+        if exclude:
+            excluded = numpy.zeros(len(sizes), dtype=bool)
+            for pk in exclude:
+                excluded[self.postings.get(pk, EMPTY)] = True
+            excluded[changed_ids] = False
+            for pk in exclude:
+                excluded[changed_postings.get(pk, EMPTY)] = True
+            counts[excluded] = 0
+        recipe_ids = numpy.flatnonzero(counts)
+        matched = counts[recipe_ids]
+        recipe_sizes = sizes[recipe_ids]
+        selected = matched >= min_coverage * recipe_sizes - COVERAGE_EPSILON
+        recipe_ids = recipe_ids[selected]
+        matched = matched[selected]
+        coverage = (matched << 20) // recipe_sizes[selected]
+        return RankedRecipes(
+            (coverage << 40) | (matched << 32) | recipe_ids, sizes
+        )
+
+
+class IngredientRecipeIndexCache:
+    """
+    Индекс IngredientRecipeIndex процесса с инкрементальным обновлением.
+    При обращении читается номер журнала изменений в общем кэше;
+    новые записи применяются к индексу одним запросом к базе.
+    Индекс строится заново, если записей больше
+    COOKABLE_INDEX_MAX_CHANGES или часть журнала вытеснена из кэша.
+    Первый индекс строится в запросе; при COOKABLE_INDEX_ASYNC
+    перестройка идет в фоновом потоке, а запросы до ее окончания
+    получают прежний индекс.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._rebuilding = False
+
+    def get(self):
+        number = get_version(RECIPE_INGREDIENTS_CHANGES_KEY)
+        index = self._index
+        if index is not None and index.number == number:
+            return index
+        with self._lock:
+            index = self._index
+            if index is None:
+                self._index = IngredientRecipeIndex.build(number)
+            elif self._rebuilding:
+                return index
+            elif not self.catch_up(index, number):
+                if not settings.COOKABLE_INDEX_ASYNC:
+                    self._index = IngredientRecipeIndex.build(number)
+                else:
+                    self._rebuilding = True
+                    executor.submit(self.rebuild, number)
+        return self._index
+
+    def rebuild(self, number):
+        """Строит индекс в фоновом потоке и подменяет им прежний."""
+        try:
+            index = IngredientRecipeIndex.build(number)
+            with self._lock:
+                self._index = index
+        finally:
+            self._rebuilding = False
+            connections.close_all()
+
+    @staticmethod
+    def catch_up(index, number):
+        """Применяет записи журнала; False, если нужна перестройка."""
+        if index.number == number:
+            return True
+        pending = number - index.number
+        if (pending < 0
+                or len(index.changed) + pending
+                > settings.COOKABLE_INDEX_MAX_CHANGES):
+            return False
+        keys = [
+            get_change_key(change)
+            for change in range(index.number + 1, number + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return False
+        index.apply_changes(
+            {pk for recipe_ids in changes.values() for pk in recipe_ids},
+            number
+        )
+        return True
+
+
+executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix='cookable-index'
+)
+
+cookable_index = IngredientRecipeIndexCache()
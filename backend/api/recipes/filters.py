@@ -1,32 +1,97 @@
-from django_filters.rest_framework import (BooleanFilter, FilterSet, filters,
-                                           ModelMultipleChoiceFilter)
+from django.conf import settings
+from django.db import connection
+from django.db.models import (BooleanField, Case, Exists, F, OuterRef, Q,
+                              Value, When)
+from django_filters.rest_framework import BooleanFilter, FilterSet, filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
 
-from recipes.models import Ingredient, Recipe, Tag
+from api.paginators import MAX_PAGE_SIZE
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart)
+from recipes.search import SEARCH_CONFIG, use_full_text_search
+
+from .services import tag_index
+
+
+def use_trigram_search():
+    """Нечеткий поиск pg_trgm доступен только в PostgreSQL."""
+    return (settings.INGREDIENT_SEARCH_TRIGRAM
+            and connection.vendor == 'postgresql')
 
 
 class IngredientFilter(FilterSet):
-    """Фильтр для поиска ингридиентов на сайте."""
-    name = filters.CharFilter(lookup_expr='startswith')
+    """
+    Фильтр для поиска ингридиентов на сайте.
+    Поиск по началу названия без учета регистра использует индекс
+    по UPPER(name), результат ограничен INGREDIENT_SEARCH_LIMIT.
+    При INGREDIENT_SEARCH_TRIGRAM добавляются нечеткие совпадения
+    pg_trgm, совпадения по началу названия идут первыми.
+    """
+    name = filters.CharFilter(method='filter_name')
+
+    def filter_name(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        if not use_trigram_search():
+            queryset = queryset.filter(name__istartswith=value)
+            return queryset[:settings.INGREDIENT_SEARCH_LIMIT]
+
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        queryset = queryset.filter(
+            Q(name__istartswith=value) | Q(name__trigram_similar=value)
+        ).annotate(
+            is_prefix=Case(
+                When(name__istartswith=value, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+            similarity=TrigramSimilarity('name', value),
+        ).order_by('-is_prefix', '-similarity', 'name')
+        return queryset[:settings.INGREDIENT_SEARCH_LIMIT]
 
     class Meta:
         model = Ingredient
         fields = ['name']
 
 
+def get_search_text(request):
+    """Текст ?search= без пробелов по краям или пустая строка."""
+    return request.query_params.get('search', '').strip()
+
+
+def get_search_query(value):
+    """Запрос websearch: слова, "фразы", or и -исключения."""
+    from django.contrib.postgres.search import SearchQuery
+
+    return SearchQuery(value, config=SEARCH_CONFIG, search_type='websearch')
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """Список чисел через запятую: ?ids=1,2,3."""
+
+
 class RecipeFilter(FilterSet):
     """
     Фильтр для представления RecipeViewSet.
     Поиск позволяет фильтровать по автору, тегам,
     включен ли рецепт в избранное пользователем
     и находится ли рецепт в корзине пользователя.
+    Условия задаются коррелированными подзапросами EXISTS, поэтому
+    JOIN не размножает строки рецептов и DISTINCT не нужен.
+    Слаги тегов проверяются по справочнику в памяти процесса.
+    Параметр ids выбирает набор рецептов по id, не более MAX_PAGE_SIZE.
+    Параметр search ищет по названию, описанию и ингредиентам:
+    в PostgreSQL по search_vector (GIN индекс) с релевантностью
+    search_rank, в остальных базах через icontains.
     """
 
-    tags = ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug'
-
-    )
+    ids = NumberInFilter(method='filter_ids')
+    search = filters.CharFilter(method='filter_search')
+    author = filters.NumberFilter(field_name='author_id')
+    tags = filters.CharFilter(method='filter_tags')
     is_favorited = BooleanFilter(
         method='filter_is_favorited'
     )
@@ -34,11 +99,58 @@ class RecipeFilter(FilterSet):
         method='filter_shopping_cart'
     )
 
+    def filter_ids(self, queryset, name, value):
+        """Фильтр рецептов по списку id."""
+        ids = {int(pk) for pk in value}
+        if len(ids) > MAX_PAGE_SIZE:
+            raise ValidationError(
+                {name: f'Можно запросить не более {MAX_PAGE_SIZE} рецептов'}
+            )
+        return queryset.filter(id__in=ids)
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск рецептов."""
+        value = value.strip()
+        if not value:
+            return queryset
+        if not use_full_text_search():
+            return queryset.filter(
+                Q(name__icontains=value)
+                | Q(text__icontains=value)
+                | Exists(RecipeIngredient.objects.filter(
+                    recipe_id=OuterRef('pk'), ingredient__name__icontains=value
+                ))
+            )
+
+        from django.contrib.postgres.search import SearchRank
+
+        query = get_search_query(value)
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        )
+
+    def filter_tags(self, queryset, name, value):
+        """Фильтр рецептов, у которых есть хотя бы один из тегов."""
+        tags = tag_index.get()
+        tag_ids = [
+            tags[slug].id for slug in self.request.query_params.getlist(name)
+            if slug in tags
+        ]
+        if not tag_ids:
+            return queryset.none()
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'), tag_id__in=tag_ids
+            )
+        ))
+
     def filter_is_favorited(self, queryset, name, value):
         """Фильтр находится ли рецепт в избранном у пользователя."""
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(favorite__user=user)
+            return queryset.filter(Exists(
+                Favorite.objects.filter(user=user, recipe_id=OuterRef('pk'))
+            ))
 
         return queryset
 
@@ -46,10 +158,43 @@ class RecipeFilter(FilterSet):
         """Фильтр находится ли рецепт в корзине у пользователя."""
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(shopping_list__user=user)
+            return queryset.filter(Exists(
+                ShoppingCart.objects.filter(
+                    user=user, recipe_id=OuterRef('pk')
+                )
+            ))
 
         return queryset
 
     class Meta:
         model = Recipe
-        fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart']
+        fields = [
+            'ids', 'search', 'author', 'tags', 'is_favorited',
+            'is_in_shopping_cart'
+        ]
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """
+    Сортировка рецептов: при полнотекстовом поиске без ?ordering=
+    сначала более релевантные. К сортировке ?ordering= добавляются
+    поля сортировки по умолчанию (-pub_date, -id), которых в ней нет:
+    при равных значениях (favorites_count = 0 у большинства рецептов)
+    страницы LIMIT/OFFSET не повторяют и не теряют рецепты.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        used = {field.lstrip('-') for field in ordering}
+        return (*ordering, *(
+            field for field in view.ordering
+            if field.lstrip('-') not in used
+        ))
+
+    def get_default_ordering(self, view):
+        ordering = super().get_default_ordering(view)
+        if get_search_text(view.request) and use_full_text_search():
+            return ('-search_rank', *ordering)
+        return ordering
@@ -0,0 +1,190 @@
+import csv
+import json
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+except ImportError:
+    canvas = None
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """
+    Базовый класс рендерера списка покупок.
+    Формат выбирается параметром запроса ?format=.
+    Метод stream получает итератор строк списка покупок
+    и по частям отдает содержимое файла для StreamingHttpResponse.
+    """
+
+    charset = 'utf-8'
+    extension = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Ответы с ошибками (например, 401) отдаются в виде JSON."""
+        return JSONRenderer().render(data, renderer_context=renderer_context)
+
+    def stream(self, rows):
+        raise NotImplementedError(
+            'Метод stream() должен быть переопределен.'
+        )
+
+    @staticmethod
+    def format_row(row):
+        return (
+            f"{row['ingredient__name']} "
+            f"({row['ingredient__unit_of_measurement']}) - "
+            f"{row['amount']}"
+        )
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    """Список покупок в виде текстового файла, строка на ингредиент."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+    extension = 'txt'
+
+    def stream(self, rows):
+        separator = ''
+        for row in rows:
+            yield f'{separator}{self.format_row(row)}'
+            separator = '\n'
+
+
+class EchoBuffer:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    """Список покупок в формате CSV."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+    extension = 'csv'
+    header = ('Ингредиент', 'Единица измерения', 'Количество')
+
+    def stream(self, rows):
+        writer = csv.writer(EchoBuffer())
+        yield writer.writerow(self.header)
+        for row in rows:
+            yield writer.writerow((
+                row['ingredient__name'],
+                row['ingredient__unit_of_measurement'],
+                row['amount'],
+            ))
+
+
+class JSONShoppingListRenderer(ShoppingListRenderer):
+    """Список покупок в формате JSON, массив объектов."""
+
+    media_type = 'application/json'
+    format = 'json'
+    extension = 'json'
+
+    def stream(self, rows):
+        separator = '['
+        for row in rows:
+            yield separator + json.dumps(
+                {
+                    'name': row['ingredient__name'],
+                    'unit_of_measurement': (
+                        row['ingredient__unit_of_measurement']
+                    ),
+                    'amount': row['amount'],
+                },
+                ensure_ascii=False,
+            )
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    """
+    Список покупок в формате PDF. Требует пакет reportlab.
+    Документ собирается целиком, но его размер ограничен
+    числом различных ингредиентов, а не числом рецептов в корзине.
+    Стандартные шрифты PDF (Helvetica) не содержат кириллицы,
+    поэтому используется TrueType шрифт SHOPPING_LIST_PDF_FONT
+    или первый найденный из font_paths.
+    """
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+    extension = 'pdf'
+    charset = None
+    font_paths = (
+        '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+        '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
+        '/usr/share/fonts/truetype/freefont/FreeSans.ttf',
+        '/usr/share/fonts/TTF/DejaVuSans.ttf',
+    )
+    # Символы, которые должны быть в шрифте.
+    required_chars = 'АаЯяЁё'
+    font_size = 12
+    margin = 50
+
+    @staticmethod
+    def get_font_name(path):
+        return f'ShoppingList-{Path(path).stem}'
+
+    def get_font(self):
+        """
+        Метод регистрирует шрифт с кириллицей и возвращает его имя.
+        Если подходящего шрифта нет, вызывает ImproperlyConfigured.
+        """
+        paths = (settings.SHOPPING_LIST_PDF_FONT, *self.font_paths)
+        registered = pdfmetrics.getRegisteredFontNames()
+        for path in paths:
+            font_name = self.get_font_name(path)
+            if font_name in registered:
+                return font_name
+            if not Path(path).is_file():
+                continue
+            font = TTFont(font_name, path)
+            if all(ord(char) in font.face.charToGlyph
+                   for char in self.required_chars):
+                pdfmetrics.registerFont(font)
+                return font_name
+        raise ImproperlyConfigured(
+            'Не найден шрифт с кириллицей для PDF, '
+            f'укажите SHOPPING_LIST_PDF_FONT. Проверены: {", ".join(paths)}'
+        )
+
+    def stream(self, rows):
+        """Шрифт проверяется до начала ответа, а не при его отправке."""
+        font = self.get_font()
+        buffer = BytesIO()
+        document = canvas.Canvas(buffer, pagesize=A4)
+        _, height = A4
+        line_height = self.font_size * 1.5
+        y = height - self.margin
+        document.setFont(font, self.font_size)
+        for row in rows:
+            if y < self.margin:
+                document.showPage()
+                document.setFont(font, self.font_size)
+                y = height - self.margin
+            document.drawString(self.margin, y, self.format_row(row))
+            y -= line_height
+        document.save()
+        return [buffer.getvalue()]
+
+
+SHOPPING_LIST_RENDERERS = [
+    TextShoppingListRenderer,
+    CSVShoppingListRenderer,
+    JSONShoppingListRenderer,
+]
+if canvas is not None:
+    SHOPPING_LIST_RENDERERS.append(PDFShoppingListRenderer)
@@ -1,25 +1,47 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
 # from django.db.models import Exists, OuterRef
-from django.shortcuts import get_object_or_404
+from django.db.models import Prefetch, prefetch_related_objects
 from drf_extra_fields.fields import Base64ImageField
-from rest_framework import validators
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.serializers import (
-    BooleanField, IntegerField, ModelSerializer,
-    PrimaryKeyRelatedField, SerializerMethodField, ReadOnlyField,
-    ValidationError
+    BooleanField, CharField, FloatField, IntegerField, ListField,
+    ModelSerializer, PrimaryKeyRelatedField, SerializerMethodField,
+    SlugRelatedField, ReadOnlyField, Serializer, ValidationError
 )
 
-from api.users.serializers import UserSerializer
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
-from users.models import Subscription
+from api.fast import FastSerializer
+from api.paginators import MAX_PAGE_SIZE
+from api.users.serializers import FastUserSerializer, UserSerializer
+from api.users.services import resolve_is_subscribed
+from recipes.images import ImageTooLarge, validate_base64_image
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+from .services import (get_ingredients_in_bulk, get_recipe_image_url,
+                       get_recipe_image_urls,
+                       invalidate_shopping_lists_for_recipes)
 
 
 User = get_user_model()
 
 
+class RecipeImageField(Base64ImageField):
+    """
+    Base64ImageField с проверкой размера файла и изображения
+    до декодирования всего base64 (RECIPE_IMAGE_MAX_SIZE,
+    RECIPE_IMAGE_MAX_DIMENSION).
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            try:
+                validate_base64_image(data.partition(';base64,')[2] or data)
+            except ImageTooLarge as error:
+                raise ValidationError(str(error))
+        return super().to_internal_value(data)
+
+
 class TagSerializer(ModelSerializer):
     """
     Сериализатор для модели Tag. Набор полей. Проверка уникальности.
@@ -54,7 +76,7 @@ class RecipeIngredientSerializer(ModelSerializer):
     id = ReadOnlyField(source='ingredient.id')
     name = ReadOnlyField(source='ingredient.name')
     unit_of_measurement = ReadOnlyField(
-        source='ingredient.measurement_unit'
+        source='ingredient.unit_of_measurement'
     )
 
     class Meta:
@@ -76,8 +98,14 @@ class RecipeSerializer(ModelSerializer):
     """
     Сериализатор для модели Recipe. Get. Набор полей и методов.
     используется в сериализаторе RecipePostSerializer
-    в методе to_representation, и в сериализаторе FavoriteRecipeSerializer
+    в методе to_representation.
     Используется в представлении RecipeViewSet для GET запросов.
+    Если в контексте передан fieldset (см. get_fieldset), лишние поля
+    удаляются, а связи, не указанные в expand, выводятся как id.
+    Поле image - вариант изображения из контекста image_variant
+    (по умолчанию full), images - все варианты по форматам.
+    При поиске (search в контексте) добавляется поле headline -
+    фрагмент описания с подсветкой совпадений или None.
     """
 
     tags = TagSerializer(read_only=True, many=True)
@@ -85,16 +113,193 @@ class RecipeSerializer(ModelSerializer):
     ingredients = RecipeIngredientSerializer(
         many=True, read_only=True, source='recipe_ingredients'
     )
-    image = Base64ImageField()
+    image = SerializerMethodField()
+    images = SerializerMethodField()
     is_favorited = BooleanField(read_only=True, default=False)
     is_in_shopping_cart = BooleanField(read_only=True, default=False)
 
     class Meta:
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time',
+            'is_in_shopping_cart', 'name', 'image', 'images', 'text',
+            'cooking_time',
         )
         model = Recipe
+        relations = ('tags', 'author', 'ingredients')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.context.get('search'):
+            self.fields['headline'] = CharField(
+                source='search_headline', read_only=True, default=None
+            )
+        fieldset = self.context.get('fieldset')
+        if fieldset is None:
+            return
+        fields, expand = fieldset
+        for name in set(self.fields) - fields - {'headline'}:
+            self.fields.pop(name)
+        for name in fields.intersection(self.Meta.relations) - expand:
+            self.fields[name] = self.get_compact_field(name)
+
+    def get_image(self, recipe):
+        return get_recipe_image_url(
+            self.context.get('request'), recipe,
+            self.context.get('image_variant', 'full')
+        )
+
+    def get_images(self, recipe):
+        return get_recipe_image_urls(self.context.get('request'), recipe)
+
+    @staticmethod
+    def get_compact_field(name):
+        """Поле связи в виде id без загрузки связанных объектов."""
+        if name == 'author':
+            return PrimaryKeyRelatedField(read_only=True)
+        if name == 'tags':
+            return PrimaryKeyRelatedField(read_only=True, many=True)
+        return SlugRelatedField(
+            slug_field='ingredient_id', source='recipe_ingredients',
+            read_only=True, many=True
+        )
+
+    @classmethod
+    def get_fieldset(cls, request):
+        """
+        Разбирает параметры ?fields= и ?expand= (через запятую).
+        Возвращает пару множеств (fields, expand) или None,
+        если параметры не переданы и нужно полное представление.
+        Связи из expand добавляются в fields автоматически.
+        """
+        params = request.query_params
+        if 'fields' not in params and 'expand' not in params:
+            return None
+        fields = {
+            name for name in params.get('fields', '').split(',') if name
+        } or set(cls.Meta.fields)
+        expand = {
+            name for name in params.get('expand', '').split(',') if name
+        }
+        errors = {}
+        unknown = fields - set(cls.Meta.fields)
+        if unknown:
+            errors['fields'] = f'Неизвестные поля: {sorted(unknown)}'
+        unknown = expand - set(cls.Meta.relations)
+        if unknown:
+            errors['expand'] = f'Неизвестные связи: {sorted(unknown)}'
+        if errors:
+            raise ValidationError(errors)
+        return fields | expand, expand
+
+
+class FastTagSerializer(FastSerializer):
+    """Быстрый сериализатор только для чтения, вывод как у TagSerializer."""
+
+    fields = TagSerializer.Meta.fields
+
+
+class FastIngredientSerializer(FastSerializer):
+    """
+    Быстрый сериализатор только для чтения,
+    вывод как у IngredientSerializer.
+    """
+
+    fields = IngredientSerializer.Meta.fields
+
+
+class FastRecipeIngredientSerializer(FastSerializer):
+    """
+    Быстрый сериализатор только для чтения,
+    вывод как у RecipeIngredientSerializer.
+    """
+
+    fields = RecipeIngredientSerializer.Meta.fields
+
+    def write_id(self, recipe_ingredient):
+        return recipe_ingredient.ingredient.id
+
+    def write_name(self, recipe_ingredient):
+        return recipe_ingredient.ingredient.name
+
+    def write_unit_of_measurement(self, recipe_ingredient):
+        return recipe_ingredient.ingredient.unit_of_measurement
+
+
+class FastRecipeSerializer(FastSerializer):
+    """
+    Быстрый сериализатор только для чтения, вывод как у RecipeSerializer,
+    включая разбор fieldset из контекста. Вложенные объекты выводятся
+    быстрыми сериализаторами тегов, автора и ингредиентов.
+    """
+
+    def get_writers(self):
+        fieldset = self.context.get('fieldset')
+        if fieldset is None:
+            fields = set(RecipeSerializer.Meta.fields)
+            expand = set(RecipeSerializer.Meta.relations)
+        else:
+            fields, expand = fieldset
+        self.fields = [
+            name for name in RecipeSerializer.Meta.fields if name in fields
+        ]
+        if self.context.get('search'):
+            self.fields.append('headline')
+        self.tag_serializer = FastTagSerializer(context=self.context)
+        self.author_serializer = FastUserSerializer(context=self.context)
+        self.ingredient_serializer = FastRecipeIngredientSerializer(
+            context=self.context
+        )
+        return [
+            (name, getattr(self, f'write_compact_{name}'))
+            if name in RecipeSerializer.Meta.relations and name not in expand
+            else (name, write)
+            for name, write in super().get_writers()
+        ]
+
+    def write_tags(self, recipe):
+        return [
+            self.tag_serializer.to_representation(tag)
+            for tag in recipe.tags.all()
+        ]
+
+    def write_compact_tags(self, recipe):
+        return [tag.id for tag in recipe.tags.all()]
+
+    def write_author(self, recipe):
+        return self.author_serializer.to_representation(recipe.author)
+
+    def write_compact_author(self, recipe):
+        return recipe.author_id
+
+    def write_ingredients(self, recipe):
+        return [
+            self.ingredient_serializer.to_representation(recipe_ingredient)
+            for recipe_ingredient in recipe.recipe_ingredients.all()
+        ]
+
+    def write_compact_ingredients(self, recipe):
+        return [
+            recipe_ingredient.ingredient_id
+            for recipe_ingredient in recipe.recipe_ingredients.all()
+        ]
+
+    def write_is_favorited(self, recipe):
+        return bool(getattr(recipe, 'is_favorited', False))
+
+    def write_is_in_shopping_cart(self, recipe):
+        return bool(getattr(recipe, 'is_in_shopping_cart', False))
+
+    def write_image(self, recipe):
+        return get_recipe_image_url(
+            self.context.get('request'), recipe,
+            self.context.get('image_variant', 'full')
+        )
+
+    def write_images(self, recipe):
+        return get_recipe_image_urls(self.context.get('request'), recipe)
+
+    def write_headline(self, recipe):
+        return getattr(recipe, 'search_headline', None)
 
 
 class RecipePostSerializer(ModelSerializer):
@@ -111,7 +316,7 @@ class RecipePostSerializer(ModelSerializer):
     ingredients = RecipeIngredientCreateSerializer(many=True)
     author = UserSerializer(read_only=True)
     ingredients = RecipeIngredientCreateSerializer(many=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
 
     class Meta:
         model = Recipe
@@ -135,6 +340,14 @@ class RecipePostSerializer(ModelSerializer):
                 raise ValidationError({
                     'Количество ингредиента не может быть равно нулю'
                 })
+        resolved = get_ingredients_in_bulk(ingredients_list)
+        missing = [pk for pk in ingredients_list if pk not in resolved]
+        if missing:
+            raise ValidationError(
+                f'Ингредиенты с id {missing} не найдены'
+            )
+        for ingredient in ingredients:
+            ingredient['ingredient'] = resolved[ingredient['id']]
         return ingredients
 
     def validate_tags(self, tags):
@@ -150,13 +363,15 @@ class RecipePostSerializer(ModelSerializer):
 
     @transaction.atomic
     def add_ingredients(self, recipe, ingredients):
-        """Атомарный метод добавления ингридиентов в рецепт."""
+        """
+        Атомарный метод добавления ингридиентов в рецепт.
+        Ингредиенты уже получены в validate_ingredients.
+        """
         ingredient_list_in_recipe = []
         for ingredient_data in ingredients:
             ingredient_list_in_recipe.append(
                 RecipeIngredient(
-                    ingredient=get_object_or_404(Ingredient,
-                                                 id=ingredient_data['id']),
+                    ingredient=ingredient_data['ingredient'],
                     amount=ingredient_data['amount'],
                     recipe=recipe,
                 )
@@ -179,76 +394,153 @@ class RecipePostSerializer(ModelSerializer):
         self.add_ingredients(recipe, ingredients)
         return recipe
 
+    @transaction.atomic
+    def update_ingredients(self, recipe, ingredients):
+        """
+        Атомарный метод изменения ингредиентов рецепта.
+        Удаляются только исключенные строки, добавляются только новые,
+        у оставшихся обновляется количество, если оно изменилось.
+        """
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredients.all()
+        }
+        new = {ingredient['id']: ingredient for ingredient in ingredients}
+        removed_ids = [
+            recipe_ingredient.id
+            for ingredient_id, recipe_ingredient in current.items()
+            if ingredient_id not in new
+        ]
+        changed = []
+        added = []
+        for ingredient_id, ingredient_data in new.items():
+            recipe_ingredient = current.get(ingredient_id)
+            if recipe_ingredient is None:
+                added.append(ingredient_data)
+            elif recipe_ingredient.amount != ingredient_data['amount']:
+                recipe_ingredient.amount = ingredient_data['amount']
+                changed.append(recipe_ingredient)
+        if removed_ids:
+            RecipeIngredient.objects.filter(id__in=removed_ids).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        if added:
+            self.add_ingredients(recipe, added)
+        if removed_ids or changed or added:
+            invalidate_shopping_lists_for_recipes([recipe.id])
+
     @transaction.atomic
     def update(self, recipe, validated_data):
-        """Атомарный метод редактирования рецепта."""
-        tags = validated_data.pop('tags')
+        """
+        Атомарный метод редактирования рецепта.
+        Теги и ингредиенты меняются, только если переданы в запросе.
+        """
+        tags = validated_data.pop('tags', None)
         if tags is not None:
-            recipe.tags.clear()
             recipe.tags.set(tags)
-        ingredients = validated_data.pop('ingredients')
+        ingredients = validated_data.pop('ingredients', None)
         if ingredients is not None:
-            RecipeIngredient.objects.filter(recipe=recipe).delete()
-            self.add_ingredients(recipe, ingredients)
+            self.update_ingredients(recipe, ingredients)
         return super().update(recipe, validated_data)
 
     def to_representation(self, instance):
-        """Возвращает сериализованные данные из метода RecipeSerializer."""
+        """
+        Возвращает сериализованные данные из метода RecipeSerializer.
+        Связанные объекты загружаются фиксированным числом запросов.
+        """
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
         return RecipeSerializer(instance, context=self.context).data
 
 
 class RecipeShortSerializer(ModelSerializer):
-    """Сокращенный сериалайзер рецепта для добавления в избранное и подписок"""
+    """
+    Сокращенный сериалайзер рецепта для добавления в избранное и подписок.
+    Изображение - вариант card.
+    """
+
+    image = SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
+    def get_image(self, recipe):
+        return get_recipe_image_url(
+            self.context.get('request'), recipe, 'card'
+        )
+
 
-class FavoriteRecipeSerializer(ModelSerializer):
+class RecipeIdsSerializer(Serializer):
     """
-    Сериализатор модели Favorite.
-    Набор полей и метод определения рецепта в корзине покупок.
-    Используется в представлении RecipeViewSet для метода favorite.
+    Список id рецептов для пакетного добавления и удаления
+    в корзину и избранное. Повторы id отбрасываются.
     """
 
-    class Meta:
-        model = Favorite
-        fields = ('user', 'recipe',)
-        validators = [
-            validators.UniqueTogetherValidator(
-                queryset=Favorite.objects.all(),
-                fields=['user', 'recipe'],
-            )
-        ]
+    recipes = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_PAGE_SIZE,
+    )
 
-    def create(self, validated_data):
-        """
-        Создает новый объект модели Favorite.
-        """
-        return Favorite.objects.create(**validated_data)
+    def validate_recipes(self, recipes):
+        return list(dict.fromkeys(recipes))
+
+
+class IdListField(ListField):
+    """Список id через запятую (?ingredients=1,2,3) или повтором параметра."""
 
+    child = IntegerField(min_value=1)
 
-class ShoppingCartSerializer(ModelSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [data]
+        return super().to_internal_value([
+            pk for item in data for pk in str(item).split(',') if pk
+        ])
+
+
+class CookableQuerySerializer(Serializer):
+    """
+    Параметры подбора рецептов по продуктам: ingredients - id
+    имеющихся ингредиентов, exclude - ингредиенты, которых в рецепте
+    быть не должно, min_coverage - минимальная доля ингредиентов
+    рецепта из ingredients.
     """
-    Предаставление модели ShoppingCart.
-    Используется в прендставлении RecipeViewSet в методе shopping_cart."""
 
-    class Meta:
-        model = ShoppingCart
-        fields = ('user', 'recipe',)
+    ingredients = IdListField(
+        allow_empty=False, max_length=settings.COOKABLE_MAX_INGREDIENTS
+    )
+    exclude = IdListField(
+        required=False, max_length=settings.COOKABLE_MAX_INGREDIENTS
+    )
+    min_coverage = FloatField(
+        required=False, default=0.0, min_value=0.0, max_value=1.0
+    )
+
+    def validate_ingredients(self, ingredients):
+        return frozenset(ingredients)
+
+    def validate_exclude(self, exclude):
+        return frozenset(exclude)
 
 
 class UserSubscribeSerializer(ModelSerializer):
     """
     Сериализатор модели автора, на которого подписался пользователь.
     Используется в представлении UsersViewSet в методах
-    subscribe и subscriptions.
+    subscribe и subscriptions. Ожидает предзагруженные рецепты.
     """
 
     is_subscribed = SerializerMethodField()
-    recipes = RecipeShortSerializer(many=True)
-    recipes_count = ReadOnlyField(source='author.recipes.count')
+    recipes = RecipeShortSerializer(many=True, read_only=True)
+    recipes_count = IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -269,12 +561,4 @@ class UserSubscribeSerializer(ModelSerializer):
 
     def get_is_subscribed(self, obj):
         """Метод наличия подписки на пользователя модели Subscription."""
-        request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
-            return False
-        return Subscription.objects.filter(
-            user=request.user, author=obj
-        ).exists()
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count
+        return resolve_is_subscribed(self.context.get('request'), obj)
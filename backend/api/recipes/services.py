@@ -1,28 +1,314 @@
-from django.db.models import Sum
+import hashlib
+from bisect import bisect_left
 
-from recipes.models import RecipeIngredient
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.storage import default_storage
+from django.db.models import CharField, Sum, Value
+from django_filters.widgets import BooleanWidget
+
+from api.cache import ProcessCache, bump_version_on_commit, get_version
+from api.users.services import get_subscribed_author_ids
+from recipes.images import FORMATS, VARIANTS, get_variant_name
+from recipes.models import (Favorite, Ingredient, RecipeIngredient,
+                            ShoppingCart, Tag)
+
+SHOPPING_LIST_CHUNK_SIZE = 500
+
+INGREDIENTS_VERSION_KEY = 'ingredients_version'
+
+TAGS_VERSION_KEY = 'tags_version'
+
+RECIPES_VERSION_KEY = 'recipes_version'
+
+# Версия счетчиков favorites_count: они меняются через update()
+# без сигналов Recipe и влияют только на сортировку по ним.
+FAVORITES_VERSION_KEY = 'favorites_version'
+
+# Поля ответа с рецептами, зависящие от пользователя запроса.
+VIEWER_FILTERS = ('is_favorited', 'is_in_shopping_cart')
+
+
+class IngredientIndex:
+    """
+    Справочник ингредиентов в памяти процесса.
+    Словарь by_id для проверки ингредиентов рецепта и отсортированный
+    список названий для поиска по началу названия без учета регистра.
+    """
+
+    def __init__(self, ingredients):
+        self.ingredients = sorted(
+            ingredients, key=lambda ingredient: ingredient.name.casefold()
+        )
+        self.by_id = {ingredient.id: ingredient for ingredient in ingredients}
+        self.keys = [
+            ingredient.name.casefold() for ingredient in self.ingredients
+        ]
+
+    def search(self, prefix, limit=None):
+        """Поиск ингредиентов по началу названия без учета регистра."""
+        prefix = prefix.casefold()
+        result = []
+        position = bisect_left(self.keys, prefix)
+        while (position < len(self.keys)
+               and self.keys[position].startswith(prefix)
+               and (limit is None or len(result) < limit)):
+            result.append(self.ingredients[position])
+            position += 1
+        return result
+
+
+def build_ingredient_index():
+    return IngredientIndex(list(Ingredient.objects.all().iterator()))
+
+
+ingredient_index = ProcessCache(
+    INGREDIENTS_VERSION_KEY, build_ingredient_index
+)
+
+
+def build_tag_index():
+    """Словарь {slug: Tag} всех тегов."""
+    return {tag.slug: tag for tag in Tag.objects.all()}
+
+
+tag_index = ProcessCache(TAGS_VERSION_KEY, build_tag_index)
+
+
+def get_ingredients_in_bulk(ingredient_ids):
+    """
+    Функция возвращает словарь {id: Ingredient} для списка id.
+    Ингредиенты берутся из справочника в памяти, отсутствующие
+    в нем догружаются из базы одним запросом in_bulk.
+    """
+    by_id = ingredient_index.get().by_id
+    ingredients = {}
+    missing_ids = []
+    for ingredient_id in ingredient_ids:
+        if ingredient_id in by_id:
+            ingredients[ingredient_id] = by_id[ingredient_id]
+        else:
+            missing_ids.append(ingredient_id)
+    if missing_ids:
+        ingredients.update(Ingredient.objects.in_bulk(missing_ids))
+    return ingredients
+
+
+def shopping_cart_version_key(user_id):
+    return f'shopping_cart_version:{user_id}'
+
+
+def invalidate_shopping_list(user_id):
+    """Функция делает устаревшим кэш списка покупок пользователя."""
+    bump_version_on_commit(shopping_cart_version_key(user_id))
+
+
+def invalidate_shopping_lists_for_recipes(recipe_ids):
+    """
+    Функция делает устаревшим кэш списков покупок всех пользователей,
+    у которых рецепты recipe_ids находятся в корзине.
+    """
+    user_ids = (
+        ShoppingCart.objects
+        .filter(recipe_id__in=recipe_ids)
+        .order_by()
+        .values_list('user_id', flat=True)
+        .distinct()
+    )
+    for user_id in user_ids:
+        invalidate_shopping_list(user_id)
+
+
+def cache_rows(rows, key):
+    """Генератор отдает строки и сохраняет их в кэш после последней."""
+    cached_rows = []
+    for row in rows:
+        cached_rows.append(row)
+        yield row
+    cache.set(key, cached_rows, settings.SHOPPING_LIST_CACHE_TIMEOUT)
 
 
 def get_shopping_list(user):
     """
     Функция для получения списока покупок пользователя.
     Используется в методе download_shopping_cart представления RecipeViewSet.
+    Список кэшируется по версии корзины пользователя и версии
+    справочника ингредиентов. Версия корзины увеличивается при изменении
+    корзины и ингредиентов ее рецептов.
+    При промахе кэша строки читаются с серверного курсора
+    порциями по SHOPPING_LIST_CHUNK_SIZE.
     """
-    ingredients = (
+    version = get_version(shopping_cart_version_key(user.id))
+    ingredients_version = get_version(INGREDIENTS_VERSION_KEY)
+    key = f'shopping_list:{user.id}:{version}:{ingredients_version}'
+    shopping_list = cache.get(key)
+    if shopping_list is not None:
+        return iter(shopping_list)
+    rows = (
         RecipeIngredient.objects
         .filter(recipe__shopping_list__user=user)
         .order_by('ingredient__name')
         .values('ingredient__name', 'ingredient__unit_of_measurement')
         .annotate(amount=Sum('amount'))
+        .iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
     )
+    return cache_rows(rows, key)
 
-    shopping_list = []
 
-    for ingredient in ingredients:
-        shopping_list.append(
-            f"{ingredient['ingredient__name']} "
-            f"({ingredient['ingredient__unit_of_measurement']}) - "
-            f"{ingredient['amount']}"
-        )
+def get_image_url(request, name):
+    """Абсолютный URL файла из хранилища или None для пустого имени."""
+    if not name:
+        return None
+    url = default_storage.url(name)
+    if request is None:
+        return url
+    return request.build_absolute_uri(url)
+
+
+def get_recipe_image_url(request, recipe, variant):
+    """URL варианта изображения рецепта в JPEG, пока его нет - исходника."""
+    if not recipe.image:
+        return None
+    return get_image_url(request, get_variant_name(recipe, variant))
+
+
+def get_recipe_image_urls(request, recipe):
+    """
+    URL всех вариантов изображения рецепта по форматам:
+    {'card': {'jpeg': ..., 'webp': ...}, ...}.
+    None, пока варианты для текущего изображения не созданы.
+    """
+    variants = recipe.image_variants or {}
+    if not recipe.image or variants.get('source') != recipe.image.name:
+        return None
+    return {
+        variant: {
+            extension: get_image_url(request, variants[variant][extension])
+            for extension in FORMATS if extension in variants[variant]
+        }
+        for variant in VARIANTS if variant in variants
+    }
 
-    return '\n'.join(shopping_list)
+
+def get_response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def get_ordering_version(request):
+    """
+    Версия счетчиков избранного, если список сортируется по ним,
+    иначе 0: отметка в избранном не сбрасывает остальные ответы.
+    """
+    if 'favorites_count' not in request.query_params.get('ordering', ''):
+        return 0
+    return get_version(FAVORITES_VERSION_KEY)
+
+
+def get_response_cache_key(request, action, pk=None):
+    """
+    Ключ общего кэша ответа с рецептами: версия рецептов
+    (и счетчиков избранного при сортировке по ним), действие,
+    адрес сайта (он входит в ссылки next/previous и изображений)
+    и параметры запроса в нормализованном виде.
+    Фильтры по избранному и корзине пользователя не кэшируются: None.
+    Их значения разбираются виджетом BooleanWidget, как в RecipeFilter
+    (регистр не важен: TRUE, True, true).
+    Не кэшируются и ответы с флагами пользователя, но без id рецептов.
+    """
+    params = request.query_params
+    widget = BooleanWidget()
+    if request.user.is_authenticated and any(
+        widget.value_from_datadict(params, None, name)
+        for name in VIEWER_FILTERS
+    ):
+        return None
+    fields = set(params.get('fields', '').split(','))
+    if fields != {''} and 'id' not in fields and fields.intersection(
+        VIEWER_FILTERS
+    ):
+        return None
+    normalized = sorted(
+        (name, sorted(params.getlist(name))) for name in params
+    )
+    signature = (
+        f'{request.build_absolute_uri("/")}:{action}:{pk}:'
+        f'{request.accepted_media_type}:{normalized!r}'
+    ).encode()
+    version = get_version(RECIPES_VERSION_KEY)
+    ordering_version = get_ordering_version(request)
+    return (
+        f'recipes:{version}:{ordering_version}:'
+        f'{hashlib.md5(signature).hexdigest()}'
+    )
+
+
+def get_page_results(data):
+    """Список рецептов ответа: страница пагинатора или один рецепт."""
+    if 'results' in data:
+        return data['results']
+    return [data]
+
+
+def strip_viewer_fields(data):
+    """
+    Общая часть ответа: флаги пользователя сброшены в False,
+    как для анонимного пользователя.
+    """
+    for recipe in get_page_results(data):
+        for name in VIEWER_FILTERS:
+            if name in recipe:
+                recipe[name] = False
+        author = recipe.get('author')
+        if isinstance(author, dict):
+            author['is_subscribed'] = False
+    return data
+
+
+def get_viewer_recipe_ids(user, recipe_ids):
+    """
+    Id рецептов из recipe_ids в избранном и в корзине пользователя
+    одним запросом UNION.
+    """
+    favorites = Favorite.objects.filter(
+        user=user, recipe_id__in=recipe_ids
+    ).values_list('recipe_id', Value('is_favorited', CharField()))
+    cart = ShoppingCart.objects.filter(
+        user=user, recipe_id__in=recipe_ids
+    ).values_list('recipe_id', Value('is_in_shopping_cart', CharField()))
+    result = {name: set() for name in VIEWER_FILTERS}
+    for recipe_id, name in favorites.order_by().union(cart.order_by()):
+        result[name].add(recipe_id)
+    return result
+
+
+def apply_viewer_overlay(request, data):
+    """
+    Накладывает на общую часть ответа флаги пользователя запроса:
+    is_favorited, is_in_shopping_cart и is_subscribed автора.
+    Общая часть из кэша не изменяется, копируются только рецепты.
+    """
+    user = request.user
+    data = data.copy()
+    recipes = [recipe.copy() for recipe in get_page_results(data)]
+    if 'results' in data:
+        data['results'] = recipes
+    else:
+        data = recipes[0]
+    if user.is_anonymous or not recipes:
+        return data
+    if any(name in recipes[0] for name in VIEWER_FILTERS):
+        viewer_ids = get_viewer_recipe_ids(
+            user, [recipe['id'] for recipe in recipes]
+        )
+    if isinstance(recipes[0].get('author'), dict):
+        author_ids = get_subscribed_author_ids(request)
+    for recipe in recipes:
+        for name in VIEWER_FILTERS:
+            if name in recipe:
+                recipe[name] = recipe['id'] in viewer_ids[name]
+        author = recipe.get('author')
+        if isinstance(author, dict):
+            recipe['author'] = {
+                **author, 'is_subscribed': author['id'] in author_ids
+            }
+    return data
@@ -1,56 +1,126 @@
 from http import HTTPStatus
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Exists, OuterRef
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 # from rest_framework.filters import SearchFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from api.cache import get_version, single_flight
+from api.conditional import ConditionalGetMixin
+from api.fast import FastReadMixin
 from api.permissions import IsAuthor
-from api.paginators import CustomPaginator
-from recipes.models import (Favorite, Ingredient, Recipe,
+from api.paginators import CustomPaginator, RecipePaginator
+from api.services import delete_links, insert_links
+from api.users.services import USERS_VERSION_KEY, get_viewer_version
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                             ShoppingCart, Tag)
+from recipes.search import SEARCH_CONFIG, use_full_text_search
+from users.models import Subscription
 
-from .filters import IngredientFilter, RecipeFilter
-from .serializers import (FavoriteRecipeSerializer, IngredientSerializer,
-                          RecipePostSerializer, RecipeSerializer,
-                          ShoppingCartSerializer, TagSerializer)
-from .services import get_shopping_list
+from .cookable import cookable_index
+from .filters import (IngredientFilter, RecipeFilter, RecipeOrderingFilter,
+                      get_search_query, get_search_text, use_trigram_search)
+from .renderers import SHOPPING_LIST_RENDERERS
+from .serializers import (CookableQuerySerializer, FastIngredientSerializer,
+                          FastRecipeSerializer, FastTagSerializer,
+                          IngredientSerializer,
+                          RecipeIdsSerializer, RecipePostSerializer,
+                          RecipeSerializer, RecipeShortSerializer,
+                          TagSerializer)
+from .services import (INGREDIENTS_VERSION_KEY, RECIPES_VERSION_KEY,
+                       TAGS_VERSION_KEY, apply_viewer_overlay,
+                       get_ordering_version, get_response_cache,
+                       get_response_cache_key, get_shopping_list,
+                       ingredient_index,
+                       invalidate_shopping_lists_for_recipes,
+                       strip_viewer_fields)
 
 User = get_user_model()
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(ConditionalGetMixin, FastReadMixin, ReadOnlyModelViewSet):
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    fast_serializer_class = FastTagSerializer
 
+    def get_etag_parts(self):
+        return [get_version(TAGS_VERSION_KEY)]
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+
+class IngredientViewSet(ConditionalGetMixin, FastReadMixin,
+                        ReadOnlyModelViewSet):
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    fast_serializer_class = FastIngredientSerializer
     # filter_backends = [SearchFilter]
     filter_backends = [DjangoFilterBackend, ]
     filterset_class = IngredientFilter
     search_fields = ('^name', 'name')
 
+    def get_etag_parts(self):
+        return [get_version(INGREDIENTS_VERSION_KEY)]
+
+    def list(self, request, *args, **kwargs):
+        """
+        Список и поиск ингредиентов по справочнику в памяти процесса,
+        без обращения к базе. Нечеткий поиск pg_trgm выполняется в базе.
+        """
+        if use_trigram_search():
+            return super().list(request, *args, **kwargs)
+        index = ingredient_index.get()
+        name = request.query_params.get('name', '').strip()
+        if name:
+            ingredients = index.search(
+                name, limit=settings.INGREDIENT_SEARCH_LIMIT
+            )
+        else:
+            ingredients = index.ingredients
+        serializer = self.get_serializer(ingredients, many=True)
+        return Response(serializer.data)
 
-class RecipeViewSet(ModelViewSet):
+    def retrieve(self, request, *args, **kwargs):
+        """Ингредиент по id из справочника в памяти процесса."""
+        pk = self.kwargs[self.lookup_field]
+        ingredient = None
+        if pk.isdigit():
+            ingredient = ingredient_index.get().by_id.get(int(pk))
+        if ingredient is None:
+            raise NotFound()
+        return Response(self.get_serializer(ingredient).data)
+
+
+class RecipeViewSet(ConditionalGetMixin, FastReadMixin, ModelViewSet):
     """
     Представление класса Recipe.
     Методы: выбор класса сериализатора,
     """
     permission_classes = (IsAuthor, )
     http_method_names = ['get', 'post', 'patch', 'delete']
-    filter_backends = (DjangoFilterBackend, )
+    filter_backends = (DjangoFilterBackend, RecipeOrderingFilter)
     filterset_class = RecipeFilter
-    pagination_class = CustomPaginator
+    ordering_fields = ('pub_date', 'favorites_count')
+    ordering = ('-pub_date', '-id')
+    pagination_class = RecipePaginator
+    fast_serializer_class = FastRecipeSerializer
+    scalar_fields = {
+        'name': ('name',),
+        'image': ('image', 'image_variants'),
+        'images': ('image', 'image_variants'),
+        'text': ('text',),
+        'cooking_time': ('cooking_time',),
+    }
 
     def get_serializer_class(self):
         """Метод для выбора класса сериализатора."""
@@ -58,62 +128,282 @@ class RecipeViewSet(ModelViewSet):
             return RecipeSerializer
         return RecipePostSerializer
 
+    @cached_property
+    def fieldset(self):
+        """Набор полей ?fields=/?expand= для GET запросов или None."""
+        if self.request.method != 'GET':
+            return None
+        return RecipeSerializer.get_fieldset(self.request)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fieldset'] = self.fieldset
+        context['image_variant'] = (
+            'card' if self.action in ('list', 'cookable') else 'full'
+        )
+        context['search'] = (
+            self.action == 'list' and bool(get_search_text(self.request))
+        )
+        return context
+
+    def get_etag_parts(self):
+        """
+        ETag списка: версия рецептов и, при сортировке по избранному,
+        версия его счетчиков - без запросов к базе. ETag рецепта:
+        его updated_at. В обоих случаях учитываются версии тегов,
+        ингредиентов, пользователей и версия избранного, корзины
+        и подписок пользователя запроса.
+        """
+        versions = [
+            get_version(TAGS_VERSION_KEY),
+            get_version(INGREDIENTS_VERSION_KEY),
+            get_version(USERS_VERSION_KEY),
+            get_viewer_version(self.request),
+        ]
+        if self.action == 'retrieve':
+            pk = self.kwargs[self.lookup_field]
+            self.updated_at = Recipe.objects.filter(
+                pk=pk if pk.isdigit() else None
+            ).values_list('updated_at', flat=True).first()
+            if self.updated_at is None:
+                return None
+            return [self.updated_at.isoformat(), *versions]
+        return [
+            get_version(RECIPES_VERSION_KEY),
+            get_ordering_version(self.request),
+            *versions,
+        ]
+
+    def get_last_modified(self):
+        """Last-Modified только для рецепта и анонимного пользователя."""
+        if self.action == 'retrieve' and self.request.user.is_anonymous:
+            return self.updated_at
+        return None
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """
+        Ответ из общего кэша RESPONSE_CACHE_ALIAS. В кэше хранится
+        часть ответа, одинаковая для всех пользователей; флаги
+        пользователя запроса накладываются поверх при каждом ответе.
+        Кэш сбрасывается сменой версии рецептов в сигналах.
+        Промах кэша пересобирает один процесс (single_flight).
+        """
+        key = get_response_cache_key(
+            request, self.action, kwargs.get(self.lookup_field)
+        )
+        if key is None:
+            return handler(request, *args, **kwargs)
+        response = None
+
+        def build():
+            nonlocal response
+            response = handler(request, *args, **kwargs)
+            if response.status_code != HTTPStatus.OK:
+                return None
+            return strip_viewer_fields(response.data)
+
+        data = single_flight(
+            key, build, settings.RESPONSE_CACHE_TIMEOUT,
+            settings.RESPONSE_CACHE_STALE_TIMEOUT, get_response_cache()
+        )
+        if data is None:
+            return response
+        return Response(apply_viewer_overlay(request, data))
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def annotate_search_headline(self, queryset):
+        search = get_search_text(self.request)
+        if self.action != 'list' or not search or not use_full_text_search():
+            return queryset
+
+        from django.contrib.postgres.search import SearchHeadline
+
+        return queryset.annotate(search_headline=SearchHeadline(
+            'text', get_search_query(search), config=SEARCH_CONFIG,
+            start_sel='<mark>', stop_sel='</mark>', max_fragments=2
+        ))
+
     def get_queryset(self):
         """
         Метод используется для получения списка объектов Recipe
         из базы данных и добавления в каждый объект дополнительных
         полей is_favorited и is_in_shopping_cart.
+        Ингредиенты, теги и подписка на автора загружаются
+        фиксированным числом запросов независимо от размера страницы.
+        При ?fields=/?expand= загружаются только запрошенные столбцы,
+        связи и аннотации. Поисковый вектор не загружается.
+        При ?search= в PostgreSQL добавляется фрагмент описания
+        с подсвеченными совпадениями search_headline; он вычисляется
+        в SELECT, то есть только для рецептов страницы.
         """
-        queryset = (
-            Recipe.objects
-            .select_related('author')
-            .prefetch_related('ingredients', 'tags')
-        )
+        fieldset = self.fieldset
+        if fieldset is None:
+            fields = expand = set(RecipeSerializer.Meta.fields)
+            queryset = Recipe.objects.defer('search_vector')
+        else:
+            fields, expand = fieldset
+            queryset = Recipe.objects.only(
+                'id', 'author', 'pub_date', 'favorites_count',
+                *{
+                    column for name in fields.intersection(self.scalar_fields)
+                    for column in self.scalar_fields[name]
+                }
+            )
         user = self.request.user
 
-        if user.is_authenticated:
-            favorite_qs = Favorite.objects.filter(
-                user=user, recipe=OuterRef('id')
-            )
-            shopping_cart_qs = ShoppingCart.objects.filter(
-                user=user, recipe=OuterRef('id')
+        queryset = self.annotate_search_headline(queryset)
+
+        if 'tags' in fields:
+            queryset = queryset.prefetch_related('tags')
+        if 'ingredients' in expand:
+            queryset = queryset.prefetch_related(Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ))
+        elif 'ingredients' in fields:
+            queryset = queryset.prefetch_related(Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.only(
+                    'id', 'recipe', 'ingredient'
+                )
+            ))
+
+        if not user.is_authenticated:
+            if 'author' in expand:
+                queryset = queryset.select_related('author')
+            return queryset
+
+        if 'author' in expand:
+            subscription_qs = Subscription.objects.filter(
+                user=user, author=OuterRef('id')
             )
-            queryset = queryset.annotate(
-                is_favorited=Exists(favorite_qs),
-                is_in_shopping_cart=Exists(shopping_cart_qs)
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'author',
+                    queryset=User.objects.annotate(
+                        is_subscribed=Exists(subscription_qs)
+                    )
+                )
             )
+        if 'is_favorited' in fields:
+            queryset = queryset.annotate(is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('id'))
+            ))
+        if 'is_in_shopping_cart' in fields:
+            queryset = queryset.annotate(is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('id'))
+            ))
 
         return queryset
 
-    def add_to_list(self, request, pk, serializer_class, model_class):
+    def perform_destroy(self, instance):
+        """Списки покупок с рецептом сбрасываются одним запросом."""
+        invalidate_shopping_lists_for_recipes([instance.id])
+        super().perform_destroy(instance)
+
+    @staticmethod
+    def get_recipe_id(pk):
+        if not str(pk).isdigit():
+            raise NotFound()
+        return int(pk)
+
+    def add_to_list(self, request, pk, model_class, message):
         """
-        Метод добавляет объект в список.
+        Метод добавляет рецепт в список одним запросом
+        INSERT ... ON CONFLICT DO NOTHING.
         Используется в методах shopping_cart и favorite.
         """
-        recipe = get_object_or_404(Recipe, id=pk)
-        data = {'user': request.user.id,
-                'recipe': recipe.id}
-        serializer = serializer_class(
-            data=data, context={'request': request}
+        recipe_id = self.get_recipe_id(pk)
+        created = insert_links(
+            model_class, 'user', request.user.id, 'recipe', [recipe_id]
+        )
+        if not created:
+            get_object_or_404(Recipe, id=recipe_id)
+            return Response({'errors': message}, status=HTTPStatus.BAD_REQUEST)
+        recipe = Recipe.objects.only(
+            'id', 'name', 'image', 'image_variants', 'cooking_time'
+        ).get(id=recipe_id)
+        serializer = RecipeShortSerializer(
+            recipe, context={'request': request}
         )
-
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-
         return Response(serializer.data, status=HTTPStatus.CREATED)
 
-    def remove_from_list(self, request, pk, Model, message):
+    def remove_from_list(self, request, pk, model_class, message):
         """
-        Метод удаляет рецепт из списка.
+        Метод удаляет рецепт из списка одним запросом DELETE.
         Используется в методах remove_from_cart и remove_from_favorite.
         """
+        recipe_id = self.get_recipe_id(pk)
+        deleted = delete_links(
+            model_class, 'user', request.user.id, 'recipe', [recipe_id]
+        )
+        if not deleted:
+            get_object_or_404(Recipe, id=recipe_id)
+            return Response({'errors': message}, status=HTTPStatus.BAD_REQUEST)
+        return Response(status=HTTPStatus.NO_CONTENT)
 
-        user = request.user
-        recipe = get_object_or_404(Recipe, id=pk)
-        Model.objects.filter(user=user,
-                             recipe=recipe).delete()
+    @transaction.atomic
+    def change_list_in_bulk(self, request, model_class, created):
+        """
+        Метод пакетно добавляет или удаляет рецепты из списка
+        одним запросом в одной транзакции.
+        Отвечает списками id измененных и пропущенных рецептов:
+        несуществующих, уже добавленных или уже удаленных.
+        Используется в методах shopping_cart_batch и favorite_batch.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        change_links = insert_links if created else delete_links
+        changed = set(change_links(
+            model_class, 'user', request.user.id, 'recipe', recipe_ids
+        ))
+        return Response(
+            {
+                'recipes': [pk for pk in recipe_ids if pk in changed],
+                'skipped': [pk for pk in recipe_ids if pk not in changed],
+            },
+            status=HTTPStatus.CREATED if created else HTTPStatus.OK
+        )
 
-        return Response({'status': message}, status=HTTPStatus.OK)
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch',
+    )
+    def shopping_cart_batch(self, request):
+        """
+        Метод пакетно добавляет (POST) или удаляет (DELETE)
+        рецепты из корзины: {"recipes": [1, 2, 3]}.
+        """
+        return self.change_list_in_bulk(
+            request, ShoppingCart, request.method == 'POST'
+        )
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        permission_classes=[IsAuthenticated],
+        url_path='favorite',
+        url_name='favorite-batch',
+    )
+    def favorite_batch(self, request):
+        """
+        Метод пакетно добавляет (POST) или удаляет (DELETE)
+        рецепты из избранного: {"recipes": [1, 2, 3]}.
+        """
+        return self.change_list_in_bulk(
+            request, Favorite, request.method == 'POST'
+        )
 
     @action(
         detail=True,
@@ -124,8 +414,8 @@ class RecipeViewSet(ModelViewSet):
         """Метод добавляет рецепт в корзину."""
         return self.add_to_list(request,
                                 pk,
-                                ShoppingCartSerializer,
-                                ShoppingCart)
+                                ShoppingCart,
+                                'Рецепт уже есть в корзине')
 
     @shopping_cart.mapping.delete
     def remove_from_cart(self, request, pk):
@@ -133,7 +423,7 @@ class RecipeViewSet(ModelViewSet):
         return self.remove_from_list(request,
                                      pk,
                                      ShoppingCart,
-                                     'Рецепт удален из корзины')
+                                     'Рецепта нет в корзине')
 
     @action(
         detail=True,
@@ -144,8 +434,8 @@ class RecipeViewSet(ModelViewSet):
         """Метод добавляет рецепт в список избранных."""
         return self.add_to_list(request,
                                 pk,
-                                FavoriteRecipeSerializer,
-                                Favorite)
+                                Favorite,
+                                'Рецепт уже есть в избранном')
 
     @favorite.mapping.delete
     def remove_from_favorite(self, request, pk):
@@ -153,25 +443,59 @@ class RecipeViewSet(ModelViewSet):
         return self.remove_from_list(request,
                                      pk,
                                      Favorite,
-                                     'Рецепт удален из списка избранных')
+                                     'Рецепта нет в избранном')
+
+    @action(methods=['GET'], detail=False)
+    def cookable(self, request):
+        """
+        Подбор рецептов по имеющимся продуктам:
+        ?ingredients=1,2,3&exclude=4&min_coverage=0.5.
+        Рецепты ранжируются по обратному индексу ингредиентов в памяти
+        процесса, из базы загружаются только рецепты страницы.
+        В каждый рецепт добавляются coverage - доля его ингредиентов
+        из ingredients - и число недостающих ингредиентов missing.
+        """
+        params = CookableQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        ranked = cookable_index.get().search(**params.validated_data)
+        paginator = CustomPaginator()
+        page = paginator.paginate_queryset(ranked, request, view=self)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for _, _, recipe_id, _ in page]
+        )
+        page = [item for item in page if item[2] in recipes]
+        results = self.get_serializer(
+            [recipes[recipe_id] for _, _, recipe_id, _ in page], many=True
+        ).data
+        for data, (coverage, _, _, missing) in zip(results, page):
+            data['coverage'] = round(coverage, 4)
+            data['missing'] = missing
+        return paginator.get_paginated_response(results)
 
     @action(
         methods=['GET'],
         detail=False,
         permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS,
     )
     def download_shopping_cart(self, request):
         """
         Метод скачивания списка покупок для всех рецептов,
         которые добавлены в список покупок пользователя.
+        Формат файла выбирается параметром ?format= (txt, csv, json, pdf),
+        содержимое отдается потоком.
         """
         user = request.user
+        renderer = request.accepted_renderer
         shopping_list = get_shopping_list(user)
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
 
-        return HttpResponse(
-            shopping_list,
-            {
-                "Content-Type": "text/plain",
-                "Content-Disposition": "attachment; filename='shop_list.txt'",
-            },
+        response = StreamingHttpResponse(
+            renderer.stream(shopping_list), content_type=content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shop_list.{renderer.extension}"'
         )
+        return response
@@ -0,0 +1,78 @@
+from django.db import connection
+
+from recipes.signals import links_changed
+
+
+def get_link_columns(model, owner_field, target_field):
+    """Имена таблицы и столбцов модели-связи и таблицы цели."""
+    opts = model._meta
+    target = opts.get_field(target_field)
+    return (
+        connection.ops.quote_name(opts.db_table),
+        connection.ops.quote_name(opts.get_field(owner_field).column),
+        connection.ops.quote_name(target.column),
+        connection.ops.quote_name(target.related_model._meta.db_table),
+    )
+
+
+def insert_links(model, owner_field, owner_id, target_field, target_ids,
+                 exclude_owner=False):
+    """
+    Добавляет связи owner -> target одним запросом
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING.
+    Несуществующие цели и уже существующие связи пропускаются
+    без ошибки. Возвращает список id целей, для которых связь создана.
+    Сигналы post_save не отправляются, вместо них links_changed.
+    """
+    if not target_ids:
+        return []
+    table, owner_column, target_column, target_table = get_link_columns(
+        model, owner_field, target_field
+    )
+    placeholders = ', '.join(['%s'] * len(target_ids))
+    exclude = f' AND {target_table}.id <> %s' if exclude_owner else ''
+    sql = (
+        f'INSERT INTO {table} ({owner_column}, {target_column}) '
+        f'SELECT %s, {target_table}.id FROM {target_table} '
+        f'WHERE {target_table}.id IN ({placeholders}){exclude} '
+        f'ON CONFLICT DO NOTHING RETURNING {target_column}'
+    )
+    params = [owner_id, *target_ids]
+    if exclude_owner:
+        params.append(owner_id)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        created_ids = [row[0] for row in cursor.fetchall()]
+    if created_ids:
+        links_changed.send(
+            sender=model, owner_id=owner_id, target_ids=created_ids,
+            created=True
+        )
+    return created_ids
+
+
+def delete_links(model, owner_field, owner_id, target_field, target_ids):
+    """
+    Удаляет связи owner -> target одним запросом DELETE ... RETURNING.
+    Возвращает список id целей, для которых связь была удалена.
+    """
+    if not target_ids:
+        return []
+    table, owner_column, target_column, _ = get_link_columns(
+        model, owner_field, target_field
+    )
+    placeholders = ', '.join(['%s'] * len(target_ids))
+    sql = (
+        f'DELETE FROM {table} WHERE {owner_column} = %s '
+        f'AND {target_column} IN ({placeholders}) '
+        f'RETURNING {target_column}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [owner_id, *target_ids])
+        deleted_ids = [row[0] for row in cursor.fetchall()]
+    if deleted_ids:
+        links_changed.send(
+            sender=model, owner_id=owner_id, target_ids=deleted_ids,
+            created=False
+        )
+    return deleted_ids
@@ -0,0 +1,139 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from recipes.images import variants_built
+from recipes.signals import links_changed
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Subscription
+
+from .cache import bump_version_on_commit
+from .paginators import count_version_key
+from .recipes.cookable import record_recipe_change, record_recipe_changes
+from .recipes.services import (FAVORITES_VERSION_KEY, RECIPES_VERSION_KEY,
+                               ingredient_index,
+                               invalidate_shopping_list,
+                               invalidate_shopping_lists_for_recipes,
+                               tag_index)
+from .users.services import USERS_VERSION_KEY, viewer_version_key
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    """Изменение корзины делает устаревшим кэш списка покупок."""
+    invalidate_shopping_list(instance.user_id)
+
+
+@receiver(links_changed, sender=ShoppingCart)
+def shopping_cart_links_changed(sender, owner_id, **kwargs):
+    """Массовое изменение корзины делает устаревшим кэш списка покупок."""
+    invalidate_shopping_list(owner_id)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Subscription)
+def viewer_list_changed(sender, instance, **kwargs):
+    """
+    Избранное, корзина и подписки входят в ответы для пользователя:
+    их изменение меняет его версию (ETag списков рецептов).
+    """
+    bump_version_on_commit(viewer_version_key(instance.user_id))
+
+
+@receiver(links_changed, sender=Favorite)
+@receiver(links_changed, sender=ShoppingCart)
+@receiver(links_changed, sender=Subscription)
+def viewer_links_changed(sender, owner_id, **kwargs):
+    bump_version_on_commit(viewer_version_key(owner_id))
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def favorite_changed(sender, **kwargs):
+    """Счетчик favorites_count рецепта изменился (сортировка списка)."""
+    bump_version_on_commit(FAVORITES_VERSION_KEY)
+
+
+@receiver(links_changed, sender=Favorite)
+def favorites_links_changed(sender, **kwargs):
+    bump_version_on_commit(FAVORITES_VERSION_KEY)
+
+
+@receiver((post_save, post_delete), sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    """
+    Данные автора входят в ответы с рецептами.
+    Вход пользователя (update_last_login) их не меняет.
+    """
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    bump_version_on_commit(USERS_VERSION_KEY)
+    bump_version_on_commit(RECIPES_VERSION_KEY)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=User)
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Subscription)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(links_changed, sender=Favorite)
+@receiver(links_changed, sender=ShoppingCart)
+@receiver(links_changed, sender=Subscription)
+def counted_table_changed(sender, update_fields=None, **kwargs):
+    """
+    Изменение таблицы, по которой считаются страницы списков,
+    делает устаревшим кэш COUNT запросов к ней.
+    Массовые изменения без сигналов видны по истечении
+    PAGINATOR_COUNT_CACHE_TIMEOUT.
+    """
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    bump_version_on_commit(count_version_key(sender._meta.db_table))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(variants_built, sender=Recipe)
+def recipe_changed(sender, **kwargs):
+    """Изменение рецепта сбрасывает общий кэш ответов с рецептами."""
+    bump_version_on_commit(RECIPES_VERSION_KEY)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    """Изменение справочника ингредиентов пересобирает его копии в памяти."""
+    ingredient_index.invalidate()
+    bump_version_on_commit(RECIPES_VERSION_KEY)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    """Изменение тегов пересобирает их справочник в памяти."""
+    tag_index.invalidate()
+    bump_version_on_commit(RECIPES_VERSION_KEY)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_cookable_changed(sender, instance, **kwargs):
+    """
+    Состав рецепта меняется вместе с рецептом: строки RecipeIngredient
+    создаются bulk_create, а редактирование в API и админке
+    сохраняет рецепт в той же транзакции. Журнал получает одну
+    запись на рецепт, а не на строку состава.
+    """
+    record_recipe_change(instance.pk)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_cookable_changed(sender, instance, **kwargs):
+    """Удаление ингредиента каскадно меняет состав рецептов с ним."""
+    record_recipe_changes(
+        RecipeIngredient.objects.filter(
+            ingredient=instance
+        ).values_list('recipe_id', flat=True).distinct()
+    )
@@ -5,7 +5,9 @@ from djoser.serializers import (
 from djoser.serializers import UserSerializer as DjoserUserSerialiser
 from rest_framework import serializers
 
-from users.models import Subscription
+from api.fast import FastSerializer
+
+from .services import resolve_is_subscribed
 
 User = get_user_model()
 
@@ -29,12 +31,16 @@ class UserSerializer(DjoserUserSerialiser):
 
     def get_is_subscribed(self, obj):
         """Метод наличия подписки на пользователя модели Subscription."""
-        request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
-            return False
-        return Subscription.objects.filter(
-            user=request.user, author=obj
-        ).exists()
+        return resolve_is_subscribed(self.context.get('request'), obj)
+
+
+class FastUserSerializer(FastSerializer):
+    """Быстрый сериализатор только для чтения, вывод как у UserSerializer."""
+
+    fields = UserSerializer.Meta.fields
+
+    def write_is_subscribed(self, user):
+        return resolve_is_subscribed(self.context.get('request'), user)
 
 
 class UserCreateSerializer(DjoserUserCreateSerializer):
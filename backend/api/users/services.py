@@ -0,0 +1,108 @@
+from django.db.models import (F, Prefetch, Window,
+                              prefetch_related_objects)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from rest_framework.exceptions import ValidationError
+
+from api.cache import get_version
+from recipes.models import Recipe
+from users.models import Subscription
+
+USERS_VERSION_KEY = 'users_version'
+
+
+def viewer_version_key(user_id):
+    return f'viewer_version:{user_id}'
+
+
+def get_viewer_version(request):
+    """
+    Версия данных, зависящих от пользователя запроса: избранное,
+    корзина и подписки. Для анонимного пользователя - 0.
+    """
+    if request.user.is_anonymous:
+        return 0
+    return get_version(viewer_version_key(request.user.id))
+
+
+def get_subscribed_author_ids(request):
+    """
+    Функция возвращает множество id авторов, на которых подписан
+    пользователь запроса. Множество загружается одним запросом
+    и сохраняется на объекте запроса, поэтому все сериализаторы
+    в рамках одного запроса используют общий результат.
+    """
+    if request is None or request.user.is_anonymous:
+        return frozenset()
+    author_ids = getattr(request, '_subscribed_author_ids', None)
+    if author_ids is None:
+        author_ids = set(
+            Subscription.objects
+            .filter(user=request.user)
+            .values_list('author_id', flat=True)
+        )
+        request._subscribed_author_ids = author_ids
+    return author_ids
+
+
+def resolve_is_subscribed(request, author):
+    """
+    Функция определяет наличие подписки на автора.
+    Используется во всех сериализаторах с полем is_subscribed.
+    Если queryset аннотирован полем is_subscribed, используется оно.
+    """
+    if hasattr(author, 'is_subscribed'):
+        return author.is_subscribed
+    return author.id in get_subscribed_author_ids(request)
+
+
+def get_recipes_limit(request):
+    """
+    Функция получает значение параметра recipes_limit из запроса.
+    Возвращает None, если параметр не передан.
+    """
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit is None:
+        return None
+    if not recipes_limit.isdigit() or int(recipes_limit) < 1:
+        raise ValidationError(
+            {'recipes_limit': 'Должно быть целым положительным числом.'}
+        )
+    return int(recipes_limit)
+
+
+def limit_recipes_per_author(queryset, limit):
+    """
+    Функция ограничивает queryset рецептов первыми limit рецептами
+    каждого автора. Номер рецепта вычисляется оконной функцией
+    ROW_NUMBER() OVER (PARTITION BY author_id) в одном подзапросе.
+    """
+    ranked = queryset.annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=F('author_id'),
+            order_by=(F('pub_date').desc(), F('id').desc()),
+        )
+    ).order_by().values('id', 'row_number')
+    sql, params = ranked.query.sql_with_params()
+    return queryset.filter(id__in=RawSQL(
+        f'SELECT ranked.id FROM ({sql}) AS ranked '
+        f'WHERE ranked.row_number <= %s',
+        (*params, limit)
+    ))
+
+
+def prefetch_author_recipes(authors, recipes_limit=None):
+    """
+    Функция загружает рецепты для списка авторов одним запросом.
+    При заданном recipes_limit каждому автору достается
+    не более recipes_limit последних рецептов.
+    """
+    recipes = Recipe.objects.filter(author__in=authors).only(
+        'id', 'name', 'image', 'image_variants', 'cooking_time',
+        'author_id', 'pub_date'
+    )
+    if recipes_limit is not None:
+        recipes = limit_recipes_per_author(recipes, recipes_limit)
+    prefetch_related_objects(authors, Prefetch('recipes', queryset=recipes))
+    return authors
@@ -1,18 +1,20 @@
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ObjectDoesNotExist
 from djoser.views import UserViewSet
 from rest_framework import filters
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from api.paginators import CustomPaginator
+from api.paginators import CustomPaginator, SubscriptionPaginator
+from api.services import delete_links, insert_links
 from users.models import Subscription
 
+from .services import get_recipes_limit, prefetch_author_recipes
+
 from api.recipes.serializers import UserSubscribeSerializer
 
 User = get_user_model()
@@ -33,29 +35,35 @@ class UsersViewSet(UserViewSet):
         permission_classes=[IsAuthenticated]
     )
     def subscribe(self, request, id):
-        """Метод создания подписки на других авторов."""
-        author = get_object_or_404(User, id=id)
+        """
+        Метод создания и удаления подписки на других авторов.
+        Подписка создается и удаляется одним запросом к базе,
+        повторные и параллельные запросы не создают дубликатов.
+        """
+        if not str(id).isdigit():
+            raise NotFound()
+        author_id = int(id)
         user = request.user
-        subscription = Subscription.objects.filter(
-            user=user, author=author
-        )
         if request.method == 'DELETE':
-            try:
-                subscription.delete()
-                return Response(
-                    f'Подписка на автора {author.username} удалена',
-                    status=HTTPStatus.OK)
-            except ObjectDoesNotExist:
-                return Response('Вы не подписаны на данного автора',
-                                status=HTTPStatus.BAD_REQUEST)
-        if request.user.id == author.id:
-            raise ValidationError('Запрещена подписка на самого себя')
-        if subscription.exists():
-            raise ValidationError('Вы уже подписаны на этого автора')
-        subscription = Subscription.objects.create(
-            user=request.user,
-            author=author
+            deleted = delete_links(
+                Subscription, 'user', user.id, 'author', [author_id]
+            )
+            if not deleted:
+                get_object_or_404(User, id=author_id)
+                raise ValidationError('Вы не подписаны на данного автора')
+            return Response(status=HTTPStatus.NO_CONTENT)
+        recipes_limit = get_recipes_limit(request)
+        created = insert_links(
+            Subscription, 'user', user.id, 'author', [author_id],
+            exclude_owner=True
         )
+        if not created:
+            get_object_or_404(User, id=author_id)
+            if user.id == author_id:
+                raise ValidationError('Запрещена подписка на самого себя')
+            raise ValidationError('Вы уже подписаны на этого автора')
+        author = User.objects.get(id=author_id)
+        prefetch_author_recipes([author], recipes_limit)
         serializer = UserSubscribeSerializer(
             author,
             context={'request': request},
@@ -66,13 +74,18 @@ class UsersViewSet(UserViewSet):
         detail=False,
         methods=['GET'],
         permission_classes=[IsAuthenticated],
-        pagination_class=CustomPaginator
+        pagination_class=SubscriptionPaginator
     )
     def subscriptions(self, request):
-        """Метод список подписок пользоваетеля."""
+        """
+        Метод список подписок пользоваетеля.
+        Параметр recipes_limit ограничивает число рецептов каждого автора.
+        """
         user = request.user
+        recipes_limit = get_recipes_limit(request)
         queryset = User.objects.filter(subscribers__user=user)
         page = self.paginate_queryset(queryset)
+        prefetch_author_recipes(page, recipes_limit)
         serializer = UserSubscribeSerializer(
             page, many=True, context={'request': request}
         )
@@ -83,6 +83,50 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='/tmp/foodgram_cache'),
+    },
+    # Общий для воркеров кэш ответов с рецептами. Версии для его
+    # сброса хранятся в кэше default.
+    'responses': {
+        'BACKEND': os.getenv(
+            'RESPONSE_CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'RESPONSE_CACHE_LOCATION', default='/tmp/foodgram_responses'
+        ),
+    },
+}
+
+RESPONSE_CACHE_ALIAS = 'responses'
+
+RESPONSE_CACHE_TIMEOUT = 60 * 5
+
+RESPONSE_CACHE_STALE_TIMEOUT = 60
+
+PROCESS_CACHE_SHARED_TIMEOUT = 60 * 60 * 24
+
+CACHE_TTL_JITTER = 0.1
+
+SINGLE_FLIGHT_LOCK_TIMEOUT = 10
+
+COOKABLE_MAX_INGREDIENTS = 50
+
+COOKABLE_INDEX_MAX_CHANGES = 10000
+
+COOKABLE_INDEX_ASYNC = (
+    os.getenv('COOKABLE_INDEX_ASYNC', default='True') == 'True'
+)
+
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    INSTALLED_APPS.append('django.contrib.postgres')
+
 AUTH_PWD_MODULE = 'django.contrib.auth.password_validation.'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -120,6 +164,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 AUTH_USER_MODEL = 'users.User'
@@ -136,6 +184,37 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = BASE_DIR / 'media'
 
+DEFAULT_FILE_STORAGE = 'recipes.storage.ContentHashStorage'
+
+INGREDIENT_SEARCH_LIMIT = 50
+
+PAGINATOR_COUNT_CACHE_TIMEOUT = 30
+
+PAGINATOR_ESTIMATE_THRESHOLD = 10000
+
+INGREDIENT_SEARCH_TRIGRAM = (
+    os.getenv('INGREDIENT_SEARCH_TRIGRAM', default='False') == 'True'
+)
+
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+
+RECIPE_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+
+RECIPE_IMAGE_MAX_DIMENSION = 8000
+
+IMAGE_VARIANTS_ASYNC = (
+    os.getenv('IMAGE_VARIANTS_ASYNC', default='True') == 'True'
+)
+
+IMAGE_VARIANTS_WORKERS = int(os.getenv('IMAGE_VARIANTS_WORKERS', default=2))
+
+FAST_SERIALIZERS = os.getenv('FAST_SERIALIZERS', default='True') == 'True'
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 # SIMPLE_JWT = {
 #     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
 #     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -0,0 +1,36 @@
+"""Настройки для тестов: SQLite и кэши без внешних сервисов."""
+import tempfile
+from pathlib import Path
+
+from .settings import *  # noqa: F401,F403
+
+TEST_ROOT = Path(tempfile.mkdtemp(prefix='foodgram-tests-'))
+
+# Файл базы, а не :memory:, чтобы тесты с потоками видели одни данные.
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(TEST_ROOT / 'db.sqlite3'),
+        'OPTIONS': {'timeout': 30},
+        'TEST': {'NAME': str(TEST_ROOT / 'test.sqlite3')},
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'foodgram-tests',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'foodgram-tests-responses',
+    },
+}
+
+MEDIA_ROOT = TEST_ROOT / 'media'
+
+IMAGE_VARIANTS_ASYNC = False
+
+COOKABLE_INDEX_ASYNC = False
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
@@ -1,5 +1,7 @@
 from django.contrib import admin
 
+from api.recipes.services import invalidate_shopping_lists_for_recipes
+
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                      ShoppingCart, Tag)
 
@@ -35,6 +37,7 @@ class RecipeAdmin(admin.ModelAdmin):
         'text',
         'cooking_time',
         'pub_date',
+        'favorites_count',
     )
     inlines = (RecipeIngredientAdmin,)
     search_fields = ('name',)
@@ -42,7 +45,13 @@ class RecipeAdmin(admin.ModelAdmin):
     readonly_fields = ('favorites',)
 
     def favorites(self, obj):
-        return obj.favorite.count()
+        return obj.favorites_count
+
+    def save_related(self, request, form, formsets, change):
+        """Ингредиенты из формы меняют списки покупок с рецептом."""
+        super().save_related(request, form, formsets, change)
+        if change:
+            invalidate_shopping_lists_for_recipes([form.instance.id])
 
 
 @admin.register(ShoppingCart)
@@ -0,0 +1,35 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def change_counter(queryset, field, delta):
+    """
+    Атомарно изменяет счетчик field на delta выражением F(),
+    не опуская его ниже нуля.
+    """
+    return queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def count_subquery(model, field):
+    """Подзапрос числа строк model, ссылающихся полем field на OuterRef."""
+    return Coalesce(
+        Subquery(
+            model.objects
+            .filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def recount(queryset, field, model, related_field):
+    """
+    Пересчитывает счетчик field одним UPDATE только в строках,
+    где он расходится с фактическим числом связанных объектов.
+    Возвращает количество исправленных строк.
+    """
+    actual = count_subquery(model, related_field)
+    return queryset.exclude(**{field: actual}).update(**{field: actual})
@@ -0,0 +1,187 @@
+import base64
+import binascii
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.dispatch import Signal
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+from PIL import Image, ImageFile, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# Варианты изображения рецепта: наибольшая сторона в пикселях.
+VARIANTS = {
+    'thumbnail': 160,
+    'card': 480,
+    'full': 1280,
+}
+VARIANTS_DIR = 'recipes/variants'
+FORMATS = {
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True,
+             'progressive': True},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+}
+if not features.check('webp'):
+    FORMATS.pop('webp')
+
+# Варианты изображения сохранены в обход save(). Аргумент: recipe_id.
+variants_built = Signal()
+
+# Размер порции base64 при потоковой проверке: кратен 4.
+CHUNK_SIZE = 64 * 1024
+# Переносы строк и пробелы, допустимые внутри base64 (RFC 2045).
+BASE64_WHITESPACE = re.compile(r'\s+')
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_VARIANTS_WORKERS,
+    thread_name_prefix='image-variants',
+)
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def iter_base64_chunks(data, chunk_size=CHUNK_SIZE):
+    """
+    Декодирует base64 порциями. Пробелы и переводы строк удаляются
+    из каждой порции, а порции выравниваются по 4 символа: остаток
+    переносится в следующую, иначе декодирование сбивается.
+    Некорректный base64 вызывает binascii.Error.
+    """
+    rest = ''
+    for start in range(0, len(data), chunk_size):
+        chunk = rest + BASE64_WHITESPACE.sub(
+            '', data[start:start + chunk_size]
+        )
+        aligned = len(chunk) - len(chunk) % 4
+        rest = chunk[aligned:]
+        if aligned:
+            yield base64.b64decode(chunk[:aligned], validate=True)
+    if rest:
+        yield base64.b64decode(rest, validate=True)
+
+
+def get_base64_image_size(data):
+    """
+    Размер изображения (ширина, высота) по base64 без декодирования
+    всего файла: base64 декодируется порциями, пока PIL не прочитает
+    заголовок. Возвращает None, если заголовок не распознан.
+    """
+    parser = ImageFile.Parser()
+    try:
+        for chunk in iter_base64_chunks(data):
+            parser.feed(chunk)
+            if parser.image is not None:
+                return parser.image.size
+    except (binascii.Error, ValueError, OSError, SyntaxError):
+        return None
+    return None
+
+
+def validate_base64_image(data):
+    """
+    Проверяет размер файла и изображения в base64 до декодирования:
+    размер файла оценивается по длине строки, размеры в пикселях
+    берутся из заголовка. Превышение лимитов вызывает ImageTooLarge.
+    """
+    max_size = settings.RECIPE_IMAGE_MAX_SIZE
+    length = len(data)
+    if length * 3 // 4 > max_size:
+        # Переносы строк не входят в размер файла.
+        length = len(BASE64_WHITESPACE.sub('', data))
+    if length * 3 // 4 > max_size:
+        raise ImageTooLarge(
+            f'Размер изображения больше {filesizeformat(max_size)}'
+        )
+    size = get_base64_image_size(data)
+    max_dimension = settings.RECIPE_IMAGE_MAX_DIMENSION
+    if size is not None and max(size) > max_dimension:
+        raise ImageTooLarge(
+            f'Изображение больше {max_dimension} пикселей по стороне'
+        )
+
+
+def encode_image(image, options):
+    buffer = BytesIO()
+    image.save(buffer, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def build_variants(recipe_id, source):
+    """
+    Создает варианты изображения рецепта во всех форматах
+    и сохраняет их пути в Recipe.image_variants.
+    Если изображение рецепта успело смениться, результат не сохраняется.
+    """
+    from .models import Recipe
+
+    with default_storage.open(source) as file:
+        image = Image.open(file)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    stem = PurePosixPath(source).stem
+    variants = {'source': source}
+    for variant, max_side in VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((max_side, max_side), Image.LANCZOS)
+        variants[variant] = {
+            extension: default_storage.save(
+                f'{VARIANTS_DIR}/{stem}_{variant}.{extension}',
+                encode_image(resized, options),
+            )
+            for extension, options in FORMATS.items()
+        }
+    updated = Recipe.objects.filter(pk=recipe_id, image=source).update(
+        image_variants=variants, updated_at=timezone.now()
+    )
+    if updated:
+        variants_built.send(sender=Recipe, recipe_id=recipe_id)
+    return variants
+
+
+def run_build_variants(recipe_id, source):
+    """Задача фонового потока: свои соединения с базой и лог ошибок."""
+    try:
+        build_variants(recipe_id, source)
+    except Exception:
+        logger.exception(
+            'Не удалось создать варианты изображения рецепта %s', recipe_id
+        )
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(recipe):
+    """
+    Ставит создание вариантов в очередь фонового потока
+    после фиксации транзакции. При IMAGE_VARIANTS_ASYNC=False
+    варианты создаются сразу, в текущем потоке.
+    """
+    if not recipe.image:
+        return
+    source = recipe.image.name
+    if settings.IMAGE_VARIANTS_ASYNC:
+        transaction.on_commit(
+            lambda: executor.submit(run_build_variants, recipe.pk, source)
+        )
+    else:
+        transaction.on_commit(lambda: build_variants(recipe.pk, source))
+
+
+def get_variant_name(recipe, variant, extension='jpeg'):
+    """
+    Путь к варианту изображения рецепта. Пока варианты не созданы,
+    возвращается исходное изображение.
+    """
+    variants = recipe.image_variants or {}
+    if variants.get('source') == recipe.image.name and variant in variants:
+        return variants[variant].get(extension)
+    return recipe.image.name
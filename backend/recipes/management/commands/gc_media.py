@@ -0,0 +1,103 @@
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from recipes.models import Recipe
+
+
+def get_referenced_files():
+    """
+    Множество путей файлов, на которые ссылаются рецепты:
+    исходные изображения и все их варианты. Рецепты читаются потоком.
+    """
+    referenced = set()
+    rows = Recipe.objects.values_list('image', 'image_variants').iterator(
+        chunk_size=2000
+    )
+    for image, variants in rows:
+        if image:
+            referenced.add(image)
+        for variant, formats in (variants or {}).items():
+            if variant == 'source':
+                continue
+            referenced.update(formats.values())
+    return referenced
+
+
+def walk_files(root):
+    """Файлы каталога рекурсивно: (относительный путь, os.DirEntry)."""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield Path(entry.path).relative_to(root).as_posix(), entry
+
+
+def get_stale_stat(path, newest):
+    """
+    stat файла, если он не изменялся после newest, иначе None.
+    Время изменения читается заново перед удалением: повторная
+    загрузка того же файла (ContentHashStorage) обновляет его.
+    """
+    try:
+        stat = os.stat(path, follow_symlinks=False)
+    except FileNotFoundError:
+        return None
+    if stat.st_mtime > newest:
+        return None
+    return stat
+
+
+class Command(BaseCommand):
+    help = 'Удаляет файлы MEDIA_ROOT, на которые не ссылается ни один рецепт'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько места освободится'
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=60 * 60,
+            help='Не трогать файлы моложе указанного числа секунд'
+        )
+        parser.add_argument(
+            '--verbose-files', action='store_true',
+            help='Выводить пути найденных файлов'
+        )
+
+    def handle(self, *args, **options):
+        root = Path(settings.MEDIA_ROOT)
+        if not root.is_dir():
+            self.stdout.write('Каталог MEDIA_ROOT не найден')
+            return
+        referenced = get_referenced_files()
+        newest = time.time() - options['min_age']
+        orphans = 0
+        reclaimed = 0
+        for name, entry in walk_files(root):
+            if name in referenced:
+                continue
+            stat = get_stale_stat(entry.path, newest)
+            if stat is None:
+                continue
+            if options['verbose_files']:
+                self.stdout.write(name)
+            if not options['dry_run']:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+            orphans += 1
+            reclaimed += stat.st_size
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} файлов: {orphans}, '
+            f'освобождено: {filesizeformat(reclaimed)}'
+        ))
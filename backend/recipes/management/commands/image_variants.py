@@ -0,0 +1,33 @@
+from django.core.management import BaseCommand
+
+from recipes.images import build_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создает варианты изображений рецептов, у которых их нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать варианты для всех рецептов',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').exclude(image=None).only(
+            'id', 'image', 'image_variants'
+        )
+        built = 0
+        for recipe in recipes.iterator():
+            if (not options['all'] and recipe.image_variants.get('source')
+                    == recipe.image.name):
+                continue
+            try:
+                build_variants(recipe.id, recipe.image.name)
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'Рецепт {recipe.id}: {error}')
+                continue
+            built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Созданы варианты изображений для {built} рецептов'
+        ))
@@ -1,27 +1,143 @@
 import csv
-# import os
+import json
+import re
+import time
+from itertools import islice
+from pathlib import Path
 
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from api.recipes.services import ingredient_index
 from recipes.models import Ingredient
 
-# FILES_DIR = os.path.dirname(os.path.dirname(os.getcwd()))
+DEFAULT_PATH = 'recipes/data/ingredients.csv'
+
+JSON_CHUNK_SIZE = 64 * 1024
+
+JSON_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def read_csv(file):
+    """Строки CSV без заголовка: название, единица измерения."""
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1]
+
+
+def iter_json_array(file, chunk_size=JSON_CHUNK_SIZE):
+    """
+    Объекты JSON массива по одному: файл читается частями
+    chunk_size, в памяти остается только непрочитанный остаток части.
+    Незавершенный объект в конце части не разбирается, пока
+    не дочитана следующая.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('JSON файл должен содержать массив')
+    position = 1
+    eof = False
+    while True:
+        position = JSON_SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise CommandError('Некорректный JSON файл')
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+
+
+def read_json(file):
+    """
+    Массив объектов с ключами name и unit_of_measurement,
+    как в API и в выгрузке списка покупок. Старое название ключа
+    measurement_unit тоже принимается.
+    """
+    for item in iter_json_array(file):
+        unit = item.get('unit_of_measurement', item.get('measurement_unit'))
+        if unit is None:
+            raise CommandError(
+                f'Нет единицы измерения у ингредиента {item["name"]}'
+            )
+        yield item['name'], unit
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
 
 
 class Command(BaseCommand):
-    help = "import data from ingredients.csv"
-
-    def handle(self, *args, **kwargs):
-        # with open(f'{FILES_DIR}/foodgram-project-react/data/ingredients.csv',
-        #           'r', encoding='utf-8') as file:
-        with open('recipes/data/ingredients.csv',
-                  'r', encoding='utf-8') as file:
-            file_reader = csv.reader(file)
-            next(file_reader)
-
-            for row in file_reader:
-                name, unit_of_measurement = row
-                Ingredient.objects.get_or_create(
-                    name=name,
-                    unit_of_measurement=unit_of_measurement
+    help = "import data from ingredients.csv or ingredients.json"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=DEFAULT_PATH,
+            help='Путь к файлу .csv или .json с ингредиентами'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одном INSERT'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Прочитать файл без записи в базу'
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError(f'Неподдерживаемый формат файла: {path}')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+
+        started = time.monotonic()
+        total_before = Ingredient.objects.count()
+        rows = 0
+        with open(path, 'r', encoding='utf-8') as file, transaction.atomic():
+            for batch in batched(reader(file), options['batch_size']):
+                rows += len(batch)
+                if options['dry_run']:
+                    continue
+                Ingredient.objects.bulk_create(
+                    (
+                        Ingredient(name=name, unit_of_measurement=unit)
+                        for name, unit in batch
+                    ),
+                    batch_size=options['batch_size'],
+                    ignore_conflicts=True,
                 )
-        self.stdout.write(self.style.SUCCESS('Ингредиенты добавлены'))
+            if not options['dry_run']:
+                ingredient_index.invalidate()
+        created = Ingredient.objects.count() - total_before
+        elapsed = time.monotonic() - started
+
+        if options['dry_run']:
+            self.stdout.write(
+                f'Пробный запуск: прочитано {rows} строк за {elapsed:.2f} с'
+            )
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Ингредиенты добавлены: прочитано {rows} строк, '
+            f'добавлено {created}, пропущено {rows - created} '
+            f'за {elapsed:.2f} с'
+        ))
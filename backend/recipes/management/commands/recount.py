@@ -0,0 +1,22 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from recipes.counters import recount
+from recipes.models import Favorite, Recipe
+from users.models import Subscription, User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики избранного, рецептов и подписчиков'
+
+    @transaction.atomic
+    def handle(self, *args, **kwargs):
+        counters = (
+            ('favorites_count', Recipe.objects.all(), Favorite, 'recipe'),
+            ('recipes_count', User.objects.all(), Recipe, 'author'),
+            ('subscribers_count', User.objects.all(), Subscription, 'author'),
+        )
+        for field, queryset, model, related_field in counters:
+            fixed = recount(queryset, field, model, related_field)
+            self.stdout.write(f'{field}: исправлено {fixed}')
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны'))
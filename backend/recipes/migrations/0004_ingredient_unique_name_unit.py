@@ -0,0 +1,82 @@
+# Generated by Django 3.2 on 2026-10-17 07:33
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+# Наибольшее значение PositiveSmallIntegerField во всех базах.
+MAX_AMOUNT = 32767
+
+
+def merge_lines(model, ingredient_ids, first_id, amount=False):
+    """
+    Строки model с ингредиентами ingredient_ids переводятся
+    на first_id. Если у рецепта несколько таких строк, остается
+    одна, при amount=True с суммой количеств, остальные удаляются.
+    """
+    kept = {}
+    extra_ids = []
+    lines = model.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).order_by('recipe_id', 'id')
+    for line in lines:
+        first = kept.get(line.recipe_id)
+        if first is None:
+            line.ingredient_id = first_id
+            kept[line.recipe_id] = line
+            continue
+        if amount:
+            first.amount = min(first.amount + line.amount, MAX_AMOUNT)
+        extra_ids.append(line.id)
+    model.objects.filter(id__in=extra_ids).delete()
+    fields = ['ingredient', 'amount'] if amount else ['ingredient']
+    model.objects.bulk_update(kept.values(), fields, batch_size=1000)
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """
+    Дубликаты ингредиентов (одинаковые название и единица измерения)
+    объединяются в запись с наименьшим id перед созданием ограничения.
+    Строки рецепта с несколькими дубликатами сливаются в одну
+    с суммой количеств.
+    """
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredients = Recipe.ingredients.through
+    duplicates = (
+        Ingredient.objects
+        .values('name', 'unit_of_measurement')
+        .annotate(first_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        ingredient_ids = list(
+            Ingredient.objects
+            .filter(name=duplicate['name'],
+                    unit_of_measurement=duplicate['unit_of_measurement'])
+            .values_list('id', flat=True)
+        )
+        first_id = duplicate['first_id']
+        merge_lines(RecipeIngredient, ingredient_ids, first_id, amount=True)
+        merge_lines(RecipeIngredients, ingredient_ids, first_id)
+        Ingredient.objects.filter(id__in=ingredient_ids).exclude(
+            id=first_id
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_ingredient_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'unit_of_measurement'), name='unique_ingredient_name_unit'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2 on 2026-10-17 07:35
+
+from django.db import migrations, models
+
+from recipes.counters import recount
+
+
+def fill_counters(apps, schema_editor):
+    """Начальные значения счетчиков избранного, рецептов и подписчиков."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorite = apps.get_model('recipes', 'Favorite')
+    User = apps.get_model('users', 'User')
+    Subscription = apps.get_model('users', 'Subscription')
+    recount(Recipe.objects.all(), 'favorites_count', Favorite, 'recipe')
+    recount(User.objects.all(), 'recipes_count', Recipe, 'author')
+    recount(User.objects.all(), 'subscribers_count', Subscription, 'author')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_pub_date_id_idx'),
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
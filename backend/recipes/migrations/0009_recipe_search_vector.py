@@ -0,0 +1,51 @@
+# Generated by Django 3.2 on 2026-10-17 09:10
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+POSTGRES_FORWARD_SQL = (
+    'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+    'ON recipes_recipe USING gin (search_vector)',
+    "UPDATE recipes_recipe AS recipe SET search_vector = "
+    "setweight(to_tsvector('russian', coalesce(recipe.name, '')), 'A') "
+    "|| setweight(to_tsvector('russian', coalesce(("
+    "SELECT string_agg(ingredient.name, ' ') "
+    "FROM recipes_recipeingredient AS recipe_ingredient "
+    "JOIN recipes_ingredient AS ingredient "
+    "ON ingredient.id = recipe_ingredient.ingredient_id "
+    "WHERE recipe_ingredient.recipe_id = recipe.id), '')), 'B') "
+    "|| setweight(to_tsvector('russian', coalesce(recipe.text, '')), 'C')",
+)
+
+POSTGRES_BACKWARD_SQL = (
+    'DROP INDEX IF EXISTS recipe_search_vector_idx',
+)
+
+
+def run_postgres_sql(statements):
+    """GIN индекс и заполнение search_vector только в PostgreSQL."""
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(
+            run_postgres_sql(POSTGRES_FORWARD_SQL),
+            run_postgres_sql(POSTGRES_BACKWARD_SQL),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import Recipe, RecipeIngredient
+
+SEARCH_CONFIG = 'russian'
+
+
+def use_full_text_search():
+    """Полнотекстовый поиск по search_vector доступен только в PostgreSQL."""
+    return connection.vendor == 'postgresql'
+
+
+def get_search_vector():
+    """
+    Поисковый вектор рецепта: название (вес A), названия
+    ингредиентов (вес B) и описание (вес C).
+    """
+    from django.contrib.postgres.aggregates import StringAgg
+    from django.contrib.postgres.search import SearchVector
+
+    ingredient_names = Subquery(
+        RecipeIngredient.objects.filter(recipe_id=OuterRef('pk'))
+        .order_by()
+        .values('recipe_id')
+        .annotate(names=StringAgg('ingredient__name', ' '))
+        .values('names')
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(ingredient_names, weight='B', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(queryset):
+    """Пересчитывает search_vector рецептов queryset одним UPDATE."""
+    if not use_full_text_search():
+        return 0
+    return queryset.update(search_vector=get_search_vector())
+
+
+def schedule_search_update(queryset):
+    """Пересчет search_vector после фиксации транзакции."""
+    if use_full_text_search():
+        transaction.on_commit(lambda: update_search_vectors(queryset))
+
+
+def schedule_recipe_search_update(recipe_id):
+    schedule_search_update(Recipe.objects.filter(pk=recipe_id))
@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .counters import change_counter
+from .images import schedule_variants
+from .models import Favorite, Ingredient, Recipe, RecipeIngredient
+from .search import schedule_recipe_search_update, schedule_search_update
+
+User = get_user_model()
+
+# Массовое изменение связей пользователя (избранное, корзина, подписки)
+# в обход save()/delete(). Аргументы: owner_id, target_ids, created.
+links_changed = Signal()
+
+
+def change_favorites_count(recipe_ids, delta):
+    change_counter(
+        Recipe.objects.filter(pk__in=recipe_ids), 'favorites_count', delta
+    )
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_created(sender, instance, created, **kwargs):
+    if created:
+        change_favorites_count([instance.recipe_id], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    change_favorites_count([instance.recipe_id], -1)
+
+
+@receiver(links_changed, sender=Favorite)
+def favorites_changed(sender, target_ids, created, **kwargs):
+    change_favorites_count(target_ids, 1 if created else -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(
+            User.objects.filter(pk=instance.author_id), 'recipes_count', 1
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(sender, instance, **kwargs):
+    """Новое изображение рецепта: создать варианты в фоне."""
+    if (instance.image
+            and instance.image_variants.get('source') != instance.image.name):
+        schedule_variants(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_counter(
+        User.objects.filter(pk=instance.author_id), 'recipes_count', -1
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_search_changed(sender, instance, **kwargs):
+    """
+    Вектор пересчитывается после фиксации транзакции, поэтому
+    учитывает и строки состава: API и админка сохраняют их в той же
+    транзакции, что и рецепт. Одно обновление на рецепт, а не на строку.
+    """
+    schedule_recipe_search_update(instance.pk)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_search_changed(sender, instance, created, **kwargs):
+    """Новое название ингредиента в векторах рецептов с ним."""
+    if created:
+        return
+    schedule_search_update(Recipe.objects.filter(Exists(
+        RecipeIngredient.objects.filter(
+            recipe_id=OuterRef('pk'), ingredient_id=instance.pk
+        )
+    )))
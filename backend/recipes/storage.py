@@ -0,0 +1,46 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+def get_content_hash(content):
+    """SHA-256 содержимого файла, читается по частям."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentHashStorage(FileSystemStorage):
+    """
+    Файловое хранилище с именами по хешу содержимого:
+    <каталог upload_to>/<2 символа хеша>/<sha256><расширение>.
+    Одинаковые файлы сохраняются один раз: если файл с таким
+    именем уже есть, запись пропускается и возвращается его имя,
+    а время изменения файла обновляется - gc_media не удалит
+    его как старый, пока ссылка на него не сохранена в рецепте.
+    Файлы может использовать несколько рецептов, поэтому они
+    не удаляются при замене изображения, а собираются командой gc_media.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        extension = posixpath.splitext(filename)[1].lower()
+        digest = get_content_hash(content)
+        name = posixpath.join(directory, digest[:2], f'{digest}{extension}')
+        if self.exists(name):
+            try:
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                # Файл удален gc_media после проверки: записать заново.
+                pass
+        return super().save(name, content, max_length)
@@ -0,0 +1,90 @@
+import os
+import random
+import statistics
+import time
+
+import pytest
+from django.db.models import Max
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+WORDS = (
+    'суп', 'салат', 'пирог', 'каша', 'соус', 'омлет', 'блины', 'торт',
+    'рагу', 'плов', 'запеканка', 'котлеты', 'оладьи', 'борщ', 'паста',
+    'быстрый', 'домашний', 'сытный', 'легкий', 'острый', 'сладкий',
+    'летний', 'постный', 'праздничный', 'духовка', 'сковорода',
+    'запекать', 'варить', 'жарить', 'тушить', 'нарезать', 'смешать',
+)
+INGREDIENT_NAMES = (
+    'мука', 'сахар', 'соль', 'яйца', 'молоко', 'масло', 'картофель',
+    'морковь', 'лук', 'чеснок', 'томаты', 'курица', 'говядина', 'рис',
+    'гречка', 'сыр', 'творог', 'сметана', 'перец', 'капуста',
+)
+# Слово, которое встречается примерно в одном рецепте из тысячи.
+RARE_WORD = 'трюфель'
+
+
+def get_size(name, default):
+    """Размер данных из переменной окружения BENCHMARK_<name>."""
+    return int(os.getenv(f'BENCHMARK_{name}', default))
+
+
+def measure(func, repeat=5):
+    """Медиана времени выполнения func, секунды."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+@pytest.fixture
+def report(capsys):
+    """Вывод результата замера, даже без pytest -s."""
+    def write(name, value, unit='мс'):
+        with capsys.disabled():
+            print(f'\n{name}: {value:.2f} {unit}')
+    return write
+
+
+@pytest.fixture
+def bench_ingredients(db):
+    return [
+        Ingredient.objects.create(name=name, unit_of_measurement='г')
+        for name in INGREDIENT_NAMES
+    ]
+
+
+def create_recipes(count, author, ingredients, per_recipe=8,
+                   batch_size=10000):
+    """
+    count рецептов с per_recipe ингредиентами через bulk_create
+    без сигналов. id задаются явно: SQLite не возвращает их
+    из bulk_create.
+    """
+    rng = random.Random(1)
+    start = (Recipe.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+    line_id = (
+        RecipeIngredient.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    ) + 1
+    for offset in range(0, count, batch_size):
+        recipes = []
+        lines = []
+        for recipe_id in range(start + offset,
+                               start + min(offset + batch_size, count)):
+            words = rng.sample(WORDS, 12)
+            if rng.random() < 0.001:
+                words.append(RARE_WORD)
+            recipes.append(Recipe(
+                id=recipe_id, author=author, name=' '.join(words[:3]),
+                text=' '.join(words[3:]), cooking_time=rng.randint(5, 120),
+            ))
+            for ingredient in rng.sample(ingredients, per_recipe):
+                lines.append(RecipeIngredient(
+                    id=line_id, recipe_id=recipe_id, ingredient=ingredient,
+                    amount=rng.randint(1, 500),
+                ))
+                line_id += 1
+        Recipe.objects.bulk_create(recipes)
+        RecipeIngredient.objects.bulk_create(lines)
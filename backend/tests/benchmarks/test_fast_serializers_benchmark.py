@@ -0,0 +1,48 @@
+import pytest
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.recipes.serializers import FastRecipeSerializer, RecipeSerializer
+from api.recipes.views import RecipeViewSet
+
+from .conftest import create_recipes, get_size, measure
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def get_view(user, params):
+    """Представление списка рецептов с запросом пользователя user."""
+    django_request = APIRequestFactory().get('/api/recipes/', params)
+    force_authenticate(django_request, user=user)
+    view = RecipeViewSet(action_map={'get': 'list'}, format_kwarg=None)
+    view.request = view.initialize_request(django_request)
+    return view
+
+
+@pytest.mark.parametrize('params', ({}, {'fields': 'id,name,image,tags'}))
+def test_fast_recipe_serializer_speedup(
+        author, user, bench_ingredients, report, params):
+    """
+    Время сериализации одного рецепта сериализатором DRF и быстрым
+    сериализатором на BENCHMARK_SERIALIZED рецептах (по умолчанию 1000)
+    без учета запросов к базе: объекты загружаются заранее.
+    """
+    size = get_size('SERIALIZED', 1000)
+    create_recipes(size, author, bench_ingredients)
+    view = get_view(user, params)
+    recipes = list(view.get_queryset())
+    context = view.get_serializer_context()
+
+    timings = {}
+    for serializer_class in (RecipeSerializer, FastRecipeSerializer):
+        def serialize():
+            return serializer_class(recipes, many=True, context=context).data
+
+        timings[serializer_class] = measure(serialize) / size * 1e6
+        report(f'{serializer_class.__name__} {params}: на объект',
+               timings[serializer_class], 'мкс')
+    speedup = timings[RecipeSerializer] / timings[FastRecipeSerializer]
+    report(f'Ускорение {params}', speedup, 'раз')
+    assert FastRecipeSerializer(recipes, many=True, context=context).data == (
+        RecipeSerializer(recipes, many=True, context=context).data
+    )
+    assert speedup > 1
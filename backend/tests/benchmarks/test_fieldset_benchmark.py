@@ -0,0 +1,28 @@
+import pytest
+from django.core.cache import caches
+
+from .conftest import create_recipes, get_size, measure
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+CARD = {'fields': 'id,name,image,cooking_time,tags', 'expand': 'tags'}
+
+
+def test_card_and_full_pages(author, bench_ingredients, user_client, report):
+    """
+    Размер и время ответа страницы из BENCHMARK_PAGE_SIZE рецептов
+    (по умолчанию 100) в режиме карточки и в полном представлении.
+    """
+    page_size = get_size('PAGE_SIZE', 100)
+    create_recipes(page_size * 10, author, bench_ingredients)
+    for mode, params in (('card', CARD), ('full', {})):
+        params = {'limit': page_size, **params}
+
+        def get():
+            caches['responses'].clear()
+            response = user_client.get('/api/recipes/', params)
+            assert response.status_code == 200
+            return response
+
+        report(f'{mode}: размер страницы', len(get().content) / 1024, 'КБ')
+        report(f'{mode}: время ответа', measure(get) * 1000)
@@ -0,0 +1,50 @@
+import pytest
+from django.core.cache import caches
+
+from api.recipes.services import build_ingredient_index, ingredient_index
+from recipes.models import Ingredient
+
+from .conftest import INGREDIENT_NAMES, WORDS, get_size, measure
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def test_ingredient_prefix_search(anon_client, report,
+                                  django_assert_num_queries):
+    """
+    Поиск ингредиентов по началу названия на BENCHMARK_INGREDIENTS
+    записях (по умолчанию 100 000): бинарный поиск по справочнику
+    в памяти против istartswith в базе.
+    """
+    size = get_size('INGREDIENTS', 100_000)
+    Ingredient.objects.bulk_create(
+        Ingredient(
+            name=f'{INGREDIENT_NAMES[number % len(INGREDIENT_NAMES)]} '
+                 f'{WORDS[number % len(WORDS)]} {number}',
+            unit_of_measurement='г',
+        )
+        for number in range(size)
+    )
+    report(f'Сборка справочника из {size} ингредиентов',
+           measure(build_ingredient_index, repeat=1) * 1000)
+    index = ingredient_index.get()
+
+    for prefix in ('м', 'Мука', 'мука суп 1'):
+        report(f'Справочник: "{prefix}"', measure(
+            lambda: index.search(prefix, limit=50), repeat=100
+        ) * 1000)
+        report(f'База istartswith: "{prefix}"', measure(
+            lambda: list(
+                Ingredient.objects.filter(name__istartswith=prefix)
+                .order_by('name')[:50]
+            )
+        ) * 1000)
+
+        def search():
+            caches['responses'].clear()
+            response = anon_client.get('/api/ingredients/', {'name': prefix})
+            assert response.status_code == 200
+
+        with django_assert_num_queries(0):
+            search()
+        report(f'/api/ingredients/?name={prefix}', measure(search) * 1000)
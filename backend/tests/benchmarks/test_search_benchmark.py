@@ -0,0 +1,41 @@
+import pytest
+from django.core.cache import caches
+from django.db import connection
+
+from api.recipes.filters import get_search_query
+from recipes.models import Recipe
+from recipes.search import update_search_vectors, use_full_text_search
+
+from .conftest import RARE_WORD, create_recipes, get_size, measure
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def test_recipe_search(author, bench_ingredients, anon_client, report):
+    """
+    ?search= на BENCHMARK_RECIPES рецептах (по умолчанию 1 000 000).
+    В PostgreSQL поиск должен идти по GIN индексу search_vector;
+    в SQLite замеряется запасной поиск icontains.
+    """
+    size = get_size('RECIPES', 1_000_000)
+    create_recipes(size, author, bench_ingredients)
+    if use_full_text_search():
+        report('Заполнение search_vector', measure(
+            lambda: update_search_vectors(Recipe.objects.all()), repeat=1
+        ), 'с')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE recipes_recipe')
+        plan = Recipe.objects.filter(
+            search_vector=get_search_query(RARE_WORD)
+        ).explain()
+        assert 'recipe_search_vector_idx' in plan, plan
+
+    for text in ('суп', RARE_WORD, 'картофель', 'острый суп'):
+        def search():
+            caches['responses'].clear()
+            response = anon_client.get(
+                '/api/recipes/', {'search': text, 'limit': 6}
+            )
+            assert response.status_code == 200
+
+        report(f'?search={text} на {size} рецептах', measure(search) * 1000)
@@ -0,0 +1,56 @@
+import pytest
+from django.core.cache import caches
+
+from users.models import Subscription, User
+
+from .conftest import create_recipes, get_size, measure
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def test_subscriptions(user, user_client, bench_ingredients, report,
+                       django_assert_max_num_queries):
+    """
+    Список подписок на BENCHMARK_AUTHORS авторов (по умолчанию 100)
+    по BENCHMARK_AUTHOR_RECIPES рецептов (по умолчанию 1000).
+    Число запросов не зависит от числа авторов и рецептов,
+    recipes_limit отбирается в базе оконной функцией.
+    """
+    authors_count = get_size('AUTHORS', 100)
+    recipes_count = get_size('AUTHOR_RECIPES', 1000)
+    User.objects.bulk_create([
+        User(username=f'author{number}', email=f'author{number}@example.com')
+        for number in range(authors_count)
+    ])
+    authors = list(User.objects.filter(username__startswith='author'))
+    for author in authors:
+        create_recipes(recipes_count, author, bench_ingredients, per_recipe=2)
+    User.objects.filter(pk__in=[author.pk for author in authors]).update(
+        recipes_count=recipes_count
+    )
+    Subscription.objects.bulk_create([
+        Subscription(user=user, author=author) for author in authors
+    ])
+
+    for recipes_limit in (3, None):
+        params = {'limit': authors_count}
+        if recipes_limit is not None:
+            params['recipes_limit'] = recipes_limit
+
+        def get():
+            for alias in ('default', 'responses'):
+                caches[alias].clear()
+            response = user_client.get('/api/users/subscriptions/', params)
+            assert response.status_code == 200
+            return response.json()
+
+        with django_assert_max_num_queries(4):
+            data = get()
+        assert len(data['results']) == min(authors_count, 100)
+        assert {len(item['recipes']) for item in data['results']} == {
+            recipes_limit or recipes_count
+        }
+        report(
+            f'Подписки: {authors_count} авторов x {recipes_count} рецептов, '
+            f'recipes_limit={recipes_limit}', measure(get) * 1000
+        )
@@ -0,0 +1,100 @@
+import pytest
+from django.core.cache import caches
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    for alias in ('default', 'responses'):
+        caches[alias].clear()
+    yield
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com',
+        first_name=username, last_name=username, password='password'
+    )
+
+
+@pytest.fixture
+def author(db):
+    return create_user('author')
+
+
+@pytest.fixture
+def user(db):
+    return create_user('user')
+
+
+@pytest.fixture
+def other_user(db):
+    return create_user('other')
+
+
+@pytest.fixture
+def anon_client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def other_client(other_user):
+    client = APIClient()
+    client.force_authenticate(other_user)
+    return client
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name=name, color=color, slug=name)
+        for name, color in (
+            ('breakfast', '#E26C2D'), ('lunch', '#49B64E'),
+            ('dinner', '#8775D2'),
+        )
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    return [
+        Ingredient.objects.create(name=name, unit_of_measurement='г')
+        for name in ('мука', 'сахар', 'соль', 'яйца', 'молоко', 'масло')
+    ]
+
+
+def create_recipe(author, name, tags=(), ingredients=(), **kwargs):
+    kwargs.setdefault('text', f'Описание {name}')
+    kwargs.setdefault('cooking_time', 10)
+    recipe = Recipe.objects.create(author=author, name=name, **kwargs)
+    recipe.tags.set(tags)
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=100)
+        for ingredient in ingredients
+    ])
+    return recipe
+
+
+@pytest.fixture
+def make_recipes(author, tags, ingredients):
+    """Рецепты с разными тегами и ингредиентами: make_recipes(count)."""
+    def make(count, recipe_author=None):
+        return [
+            create_recipe(
+                recipe_author or author, f'Рецепт {number}',
+                tags=tags[number % len(tags):][:2],
+                ingredients=ingredients[number % 3:][:3],
+            )
+            for number in range(count)
+        ]
+    return make
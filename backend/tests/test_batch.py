@@ -0,0 +1,135 @@
+import pytest
+
+from api.cache import get_version
+from api.paginators import MAX_PAGE_SIZE
+from api.recipes.services import FAVORITES_VERSION_KEY
+from api.users.services import viewer_version_key
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+LIST_URL = '/api/recipes/'
+BATCH_URLS = {
+    Favorite: '/api/recipes/favorite/',
+    ShoppingCart: '/api/recipes/shopping_cart/',
+}
+MISSING_ID = 10 ** 6
+
+
+def send(client, method, model, recipe_ids):
+    return getattr(client, method)(
+        BATCH_URLS[model], {'recipes': recipe_ids}, format='json'
+    )
+
+
+def listed(model, user):
+    return sorted(
+        model.objects.filter(user=user).values_list('recipe_id', flat=True)
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('model', (Favorite, ShoppingCart))
+def test_batch_reports_changed_and_skipped(
+        make_recipes, user, user_client, model,
+        django_capture_on_commit_callbacks):
+    first, second, third = (recipe.id for recipe in make_recipes(3))
+    model.objects.create(user=user, recipe_id=first)
+    viewer_version = get_version(viewer_version_key(user.id))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = send(
+            user_client, 'post', model, [first, second, second, MISSING_ID]
+        )
+    assert response.status_code == 201
+    assert response.json() == {
+        'recipes': [second], 'skipped': [first, MISSING_ID],
+    }
+    assert listed(model, user) == [first, second]
+    assert get_version(viewer_version_key(user.id)) != viewer_version
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = send(user_client, 'delete', model, [first, third])
+    assert response.status_code == 200
+    assert response.json() == {'recipes': [first], 'skipped': [third]}
+    assert listed(model, user) == [second]
+
+
+@pytest.mark.django_db
+def test_favorite_batch_updates_counters_and_ordering_version(
+        make_recipes, user, user_client, django_capture_on_commit_callbacks):
+    recipes = make_recipes(3)
+    ids = [recipe.id for recipe in recipes]
+    version = get_version(FAVORITES_VERSION_KEY)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        send(user_client, 'post', Favorite, ids[:2])
+    assert dict(Recipe.objects.values_list('id', 'favorites_count')) == {
+        ids[0]: 1, ids[1]: 1, ids[2]: 0,
+    }
+    assert get_version(FAVORITES_VERSION_KEY) != version
+
+    send(user_client, 'delete', Favorite, ids)
+    assert set(
+        Recipe.objects.values_list('favorites_count', flat=True)
+    ) == {0}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('model', (Favorite, ShoppingCart))
+@pytest.mark.parametrize('method', ('post', 'delete'))
+def test_batch_query_count_does_not_grow(
+        make_recipes, user_client, model, method,
+        django_assert_max_num_queries):
+    ids = [recipe.id for recipe in make_recipes(60)]
+    counts = []
+    for batch in (ids[:5], ids[5:]):
+        if method == 'delete':
+            send(user_client, 'post', model, batch)
+        with django_assert_max_num_queries(10) as context:
+            response = send(user_client, method, model, batch)
+        assert len(response.json()['recipes']) == len(batch)
+        counts.append(len(context.captured_queries))
+    assert counts[0] == counts[1], counts
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('recipes', (
+    [], ['один'], [0], list(range(1, MAX_PAGE_SIZE + 2)),
+))
+def test_batch_rejects_invalid_lists(user_client, recipes):
+    response = send(user_client, 'post', Favorite, recipes)
+    assert response.status_code == 400
+    assert 'recipes' in response.json()
+
+
+@pytest.mark.django_db
+def test_batch_requires_authentication(anon_client, make_recipes):
+    recipe = make_recipes(1)[0]
+    response = send(anon_client, 'post', Favorite, [recipe.id])
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_ids_filter_returns_set_in_one_page(make_recipes, anon_client):
+    ids = [recipe.id for recipe in make_recipes(20)]
+    wanted = ids[:15]
+    response = anon_client.get(
+        LIST_URL, {'ids': ','.join(map(str, [*wanted, MISSING_ID]))}
+    )
+    data = response.json()
+    assert data['count'] == 15
+    assert data['next'] is None
+    assert sorted(recipe['id'] for recipe in data['results']) == wanted
+
+    data = anon_client.get(
+        LIST_URL, {'ids': ','.join(map(str, wanted)), 'limit': 4}
+    ).json()
+    assert len(data['results']) == 4
+    assert data['next'] is not None
+
+
+@pytest.mark.django_db
+def test_ids_filter_is_capped(anon_client):
+    ids = ','.join(str(pk) for pk in range(1, MAX_PAGE_SIZE + 2))
+    response = anon_client.get(LIST_URL, {'ids': ids})
+    assert response.status_code == 400
+    assert 'ids' in response.json()
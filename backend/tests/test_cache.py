@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from api.cache import single_flight
+
+PARALLEL_MISSES = 50
+KEY = 'recipes:1:page'
+
+
+def slow_build(builds_path):
+    """build() для single_flight: отмечает вызов строкой в файле."""
+    def build():
+        fd = os.open(builds_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND)
+        try:
+            os.write(fd, b'1\n')
+        finally:
+            os.close(fd)
+        time.sleep(0.2)
+        return 'page'
+    return build
+
+
+def count_builds(builds_path):
+    with open(builds_path) as builds:
+        return len(builds.readlines())
+
+
+def miss(location, builds_path, barrier, results):
+    backend = FileBasedCache(location, {})
+    barrier.wait()
+    results.put(single_flight(KEY, slow_build(builds_path), 60, 0, backend))
+
+
+def test_single_flight_builds_once_across_processes(tmp_path):
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(PARALLEL_MISSES)
+    results = context.Queue()
+    builds_path = str(tmp_path / 'builds')
+    processes = [
+        context.Process(
+            target=miss,
+            args=(str(tmp_path / 'cache'), builds_path, barrier, results)
+        )
+        for _ in range(PARALLEL_MISSES)
+    ]
+    for process in processes:
+        process.start()
+    values = [results.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join()
+    assert values == ['page'] * PARALLEL_MISSES
+    assert count_builds(builds_path) == 1
+    assert not os.listdir(tmp_path / 'cache' / 'locks')
+
+
+@pytest.mark.parametrize('make_backend', (
+    lambda path: FileBasedCache(str(path / 'cache'), {}),
+    lambda path: LocMemCache('single-flight', {}),
+), ids=('filebased', 'locmem'))
+def test_single_flight_builds_once_across_threads(tmp_path, make_backend):
+    backend = make_backend(tmp_path)
+    barrier = threading.Barrier(PARALLEL_MISSES)
+    builds_path = str(tmp_path / 'builds')
+    values = []
+
+    def run():
+        barrier.wait()
+        values.append(
+            single_flight(KEY, slow_build(builds_path), 60, 0, backend)
+        )
+
+    threads = [threading.Thread(target=run) for _ in range(PARALLEL_MISSES)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert values == ['page'] * PARALLEL_MISSES
+    assert count_builds(builds_path) == 1
@@ -0,0 +1,60 @@
+import pytest
+from django.contrib.auth.models import update_last_login
+
+LIST_URL = '/api/recipes/'
+
+
+def get_ids(response):
+    return [recipe['id'] for recipe in response.json()['results']]
+
+
+@pytest.mark.django_db
+def test_not_modified_list_does_not_query_database(
+        make_recipes, user_client, django_assert_num_queries):
+    make_recipes(5)
+    etag = user_client.get(LIST_URL, {'limit': 3})['ETag']
+    with django_assert_num_queries(0):
+        response = user_client.get(
+            LIST_URL, {'limit': 3}, HTTP_IF_NONE_MATCH=etag
+        )
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_favorites_ordering_follows_favorites_count(
+        make_recipes, user_client, other_client,
+        django_capture_on_commit_callbacks):
+    recipes = make_recipes(3)
+    params = {'ordering': '-favorites_count', 'limit': 3}
+    response = user_client.get(LIST_URL, params)
+    first_id = get_ids(response)[0]
+    favorite = next(recipe for recipe in recipes if recipe.id != first_id)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        created = other_client.post(f'{LIST_URL}{favorite.id}/favorite/')
+    assert created.status_code == 201
+
+    fresh = user_client.get(
+        LIST_URL, params, HTTP_IF_NONE_MATCH=response['ETag']
+    )
+    assert fresh.status_code == 200
+    assert get_ids(fresh)[0] == favorite.id
+
+
+@pytest.mark.django_db
+def test_login_keeps_recipe_list_etag(
+        make_recipes, author, user_client,
+        django_capture_on_commit_callbacks):
+    make_recipes(2)
+    etag = user_client.get(LIST_URL)['ETag']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        update_last_login(None, author)
+    response = user_client.get(LIST_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    with django_capture_on_commit_callbacks(execute=True):
+        author.first_name = 'Новое имя'
+        author.save()
+    response = user_client.get(LIST_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
@@ -0,0 +1,101 @@
+import multiprocessing
+import threading
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache.backends.filebased import FileBasedCache
+
+from api.recipes import cookable
+from api.cache import bump_version
+from api.recipes.cookable import (RECIPE_INGREDIENTS_CHANGES_KEY,
+                                  IngredientRecipeIndex,
+                                  IngredientRecipeIndexCache, get_change_key,
+                                  record_recipe_change)
+
+from .conftest import create_recipe
+
+PARALLEL_CHANGES = 50
+
+
+def record(barrier, recipe_id):
+    barrier.wait()
+    record_recipe_change(recipe_id)
+
+
+@pytest.fixture
+def file_cache(tmp_path, monkeypatch):
+    """Общий для процессов файловый кэш журнала изменений."""
+    backend = FileBasedCache(str(tmp_path / 'cache'), {})
+    monkeypatch.setattr(cookable, 'cache', backend)
+    monkeypatch.setattr('api.cache.cache', backend)
+    # Вне транзакции on_commit выполняет функцию сразу.
+    monkeypatch.setattr(
+        cookable.transaction, 'on_commit', lambda func: func()
+    )
+    return backend
+
+
+def test_recipe_changes_journal_is_consistent_across_processes(file_cache):
+    start = cookable.get_version(RECIPE_INGREDIENTS_CHANGES_KEY)
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(PARALLEL_CHANGES)
+    processes = [
+        context.Process(target=record, args=(barrier, recipe_id))
+        for recipe_id in range(PARALLEL_CHANGES)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    number = file_cache.get(RECIPE_INGREDIENTS_CHANGES_KEY)
+    assert number == start + PARALLEL_CHANGES
+    changes = file_cache.get_many([
+        get_change_key(change) for change in range(start + 1, number + 1)
+    ])
+    assert sorted(
+        pk for recipe_ids in changes.values() for pk in recipe_ids
+    ) == list(range(PARALLEL_CHANGES))
+
+
+def test_rebuild_serves_previous_index_until_ready(settings, monkeypatch):
+    settings.COOKABLE_INDEX_ASYNC = True
+    settings.COOKABLE_INDEX_MAX_CHANGES = 0
+    release = threading.Event()
+    built = []
+
+    def build(number):
+        if built:
+            release.wait(10)
+        built.append(number)
+        return SimpleNamespace(number=number, changed={})
+
+    monkeypatch.setattr(IngredientRecipeIndex, 'build', build)
+    index_cache = IngredientRecipeIndexCache()
+    first = index_cache.get()
+    bump_version(RECIPE_INGREDIENTS_CHANGES_KEY)
+
+    assert index_cache.get() is first
+    assert index_cache.get() is first
+    release.set()
+    cookable.executor.submit(lambda: None).result(10)
+
+    rebuilt = index_cache.get()
+    assert rebuilt is not first
+    assert rebuilt.number == first.number + 1
+    assert len(built) == 2
+
+
+@pytest.mark.django_db
+def test_ingredient_delete_records_its_recipes_once(
+        author, ingredients, django_capture_on_commit_callbacks):
+    recipes = [
+        create_recipe(author, f'Рецепт {number}', ingredients=ingredients[:2])
+        for number in range(3)
+    ]
+    start = cookable.get_version(RECIPE_INGREDIENTS_CHANGES_KEY)
+    with django_capture_on_commit_callbacks(execute=True):
+        ingredients[0].delete()
+    assert cookable.get_version(RECIPE_INGREDIENTS_CHANGES_KEY) == start + 1
+    assert sorted(cookable.cache.get(get_change_key(start + 1))) == [
+        recipe.id for recipe in recipes
+    ]
@@ -0,0 +1,69 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from recipes.counters import change_counter
+from recipes.models import Favorite, Recipe
+from users.models import Subscription, User
+
+from .conftest import create_recipe
+
+
+@pytest.mark.django_db
+def test_change_counter_is_one_update_and_never_negative(
+        author, django_assert_num_queries):
+    recipes = [create_recipe(author, f'Рецепт {number}') for number in (1, 2)]
+    queryset = Recipe.objects.filter(pk__in=[recipe.pk for recipe in recipes])
+    with django_assert_num_queries(1):
+        assert change_counter(queryset, 'favorites_count', 2) == 2
+    change_counter(queryset.filter(pk=recipes[0].pk), 'favorites_count', -5)
+    assert sorted(queryset.values_list('favorites_count', flat=True)) == [0, 2]
+
+
+@pytest.mark.django_db
+def test_counters_follow_favorites_recipes_and_subscriptions(
+        author, user, other_user):
+    recipe = create_recipe(author, 'Рецепт')
+    Favorite.objects.create(user=user, recipe=recipe)
+    Favorite.objects.create(user=other_user, recipe=recipe)
+    Subscription.objects.create(user=user, author=author)
+    create_recipe(author, 'Второй рецепт')
+    Favorite.objects.filter(user=user).delete()
+
+    recipe.refresh_from_db()
+    author.refresh_from_db()
+    assert recipe.favorites_count == 1
+    assert author.recipes_count == 2
+    assert author.subscribers_count == 1
+
+
+@pytest.mark.django_db
+def test_recount_fixes_only_drifted_counters(author, user, other_user):
+    recipe = create_recipe(author, 'Рецепт')
+    Favorite.objects.create(user=user, recipe=recipe)
+    Subscription.objects.create(user=user, author=author)
+    Recipe.objects.update(favorites_count=7)
+    User.objects.filter(pk=author.pk).update(
+        recipes_count=0, subscribers_count=3
+    )
+    User.objects.filter(pk=other_user.pk).update(subscribers_count=1)
+
+    out = StringIO()
+    call_command('recount', stdout=out)
+
+    recipe.refresh_from_db()
+    author.refresh_from_db()
+    other_user.refresh_from_db()
+    assert recipe.favorites_count == 1
+    assert (author.recipes_count, author.subscribers_count) == (1, 1)
+    assert other_user.subscribers_count == 0
+    output = out.getvalue()
+    assert 'favorites_count: исправлено 1' in output
+    assert 'recipes_count: исправлено 1' in output
+    assert 'subscribers_count: исправлено 2' in output
+
+    out = StringIO()
+    call_command('recount', stdout=out)
+    assert 'исправлено 0' in out.getvalue()
+    assert 'исправлено 1' not in out.getvalue()
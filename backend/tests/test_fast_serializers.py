@@ -0,0 +1,70 @@
+import pytest
+from django.core.cache import caches
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+from .conftest import create_recipe
+
+IMAGE = 'recipes/ab/abcdef.png'
+
+URLS = (
+    '/api/tags/',
+    '/api/tags/{tag}/',
+    '/api/ingredients/',
+    '/api/ingredients/?name=Мук',
+    '/api/ingredients/{ingredient}/',
+    '/api/recipes/',
+    '/api/recipes/?limit=2&page=2',
+    '/api/recipes/?is_favorited=1',
+    '/api/recipes/?fields=id,name,images',
+    '/api/recipes/?fields=id,is_favorited&expand=author',
+    '/api/recipes/?expand=tags,ingredients',
+    '/api/recipes/{recipe}/',
+    '/api/recipes/{recipe}/?fields=image,images,is_in_shopping_cart',
+)
+
+
+@pytest.fixture
+def catalog(author, user, tags, ingredients):
+    recipes = [
+        create_recipe(
+            author, f'Рецепт {number}', tags=tags[number % 3:],
+            ingredients=ingredients[number:number + 3],
+        )
+        for number in range(4)
+    ]
+    recipe = recipes[0]
+    recipe.image = IMAGE
+    recipe.image_variants = {
+        'source': IMAGE,
+        'card': {'jpeg': 'recipes/variants/abcdef-card.jpeg'},
+        'full': {'jpeg': 'recipes/variants/abcdef-full.jpeg'},
+    }
+    recipe.save()
+    Favorite.objects.create(user=user, recipe=recipe)
+    ShoppingCart.objects.create(user=user, recipe=recipes[1])
+    Subscription.objects.create(user=user, author=author)
+    return {'tag': tags[0].id, 'ingredient': ingredients[0].id,
+            'recipe': recipe.id}
+
+
+def get_content(client, url, settings, fast):
+    """Ответ без общего кэша ответов, собранный выбранным сериализатором."""
+    settings.FAST_SERIALIZERS = fast
+    caches['responses'].clear()
+    response = client.get(url)
+    assert response.status_code == 200, response.content
+    return response.content
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', URLS)
+@pytest.mark.parametrize('client_name', ('anon_client', 'user_client'))
+def test_fast_serializers_match_drf_byte_for_byte(
+        request, catalog, settings, url, client_name):
+    client = request.getfixturevalue(client_name)
+    url = url.format(**catalog)
+    assert get_content(client, url, settings, fast=True) == get_content(
+        client, url, settings, fast=False
+    )
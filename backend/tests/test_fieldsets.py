@@ -0,0 +1,92 @@
+import pytest
+from django.core.cache import caches
+
+LIST_URL = '/api/recipes/'
+# Набор полей карточки в сетке рецептов.
+CARD = {'fields': 'id,name,image,cooking_time,tags', 'expand': 'tags'}
+# Поля и таблицы, которые карточка не должна загружать.
+SKIPPED_COLUMNS = ('"text"', '"search_vector"')
+SKIPPED_TABLES = (
+    'recipes_recipeingredient', 'users_user', 'recipes_favorite',
+    'recipes_shoppingcart', 'users_subscription',
+)
+
+
+def get_page(client, django_assert_max_num_queries, **params):
+    for alias in ('default', 'responses'):
+        caches[alias].clear()
+    with django_assert_max_num_queries(10) as context:
+        response = client.get(LIST_URL, {'limit': 6, **params})
+    assert response.status_code == 200
+    return response, [query['sql'] for query in context.captured_queries]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('viewer', ('anon_client', 'user_client'))
+def test_card_fieldset_prunes_columns_and_relations(
+        request, make_recipes, viewer, django_assert_max_num_queries):
+    client = request.getfixturevalue(viewer)
+    make_recipes(8)
+    response, queries = get_page(client, django_assert_max_num_queries, **CARD)
+
+    # COUNT, рецепты страницы и их теги.
+    assert len(queries) == 3, queries
+    recipes_sql = next(
+        sql for sql in queries
+        if sql.startswith('SELECT "recipes_recipe"."id"')
+    )
+    for column in SKIPPED_COLUMNS:
+        assert column not in recipes_sql
+    for table in SKIPPED_TABLES:
+        assert not any(table in sql for sql in queries), table
+    for recipe in response.json()['results']:
+        assert set(recipe) == set(CARD['fields'].split(','))
+        assert {'id', 'name', 'slug', 'color'} <= set(recipe['tags'][0])
+
+
+@pytest.mark.django_db
+def test_compact_relations_are_ids_without_queries(
+        make_recipes, user_client, ingredients, django_assert_max_num_queries):
+    make_recipes(3)
+    response, queries = get_page(
+        user_client, django_assert_max_num_queries,
+        fields='id,author,ingredients'
+    )
+    assert not any('users_user' in sql for sql in queries)
+    assert not any('recipes_ingredient"' in sql for sql in queries)
+    ingredient_ids = {ingredient.id for ingredient in ingredients}
+    for recipe in response.json()['results']:
+        assert isinstance(recipe['author'], int)
+        assert set(recipe['ingredients']) <= ingredient_ids
+
+
+@pytest.mark.django_db
+def test_card_is_smaller_and_cheaper_than_full(
+        make_recipes, user_client, django_assert_max_num_queries):
+    make_recipes(6)
+    card, card_queries = get_page(
+        user_client, django_assert_max_num_queries, **CARD
+    )
+    full, full_queries = get_page(user_client, django_assert_max_num_queries)
+    assert len(card_queries) < len(full_queries)
+    assert len(card.content) * 2 < len(full.content)
+    card_results = card.json()['results']
+    full_results = full.json()['results']
+    assert [recipe['id'] for recipe in card_results] == [
+        recipe['id'] for recipe in full_results
+    ]
+    for card_recipe, full_recipe in zip(card_results, full_results):
+        assert card_recipe == {
+            name: full_recipe[name] for name in card_recipe
+        }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params,field', (
+    ({'fields': 'id,secret'}, 'fields'),
+    ({'expand': 'name'}, 'expand'),
+))
+def test_unknown_fields_are_rejected(anon_client, params, field):
+    response = anon_client.get(LIST_URL, params)
+    assert response.status_code == 400
+    assert field in response.json()
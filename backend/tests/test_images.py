@@ -0,0 +1,66 @@
+import base64
+import os
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from recipes.images import (CHUNK_SIZE, ImageTooLarge, get_base64_image_size,
+                            iter_base64_chunks, validate_base64_image)
+
+SIZE = (300, 200)
+
+
+@pytest.fixture(scope='module')
+def png():
+    """PNG из шума: в base64 больше одной порции CHUNK_SIZE."""
+    buffer = BytesIO()
+    Image.frombytes('RGB', SIZE, os.urandom(SIZE[0] * SIZE[1] * 3)).save(
+        buffer, format='PNG'
+    )
+    data = buffer.getvalue()
+    assert len(data) * 4 // 3 > CHUNK_SIZE
+    return data
+
+
+def wrap(data, separator):
+    """base64 с переносом строк по 76 символов, как в MIME."""
+    encoded = base64.b64encode(data).decode()
+    return separator.join(
+        encoded[start:start + 76] for start in range(0, len(encoded), 76)
+    )
+
+
+@pytest.mark.parametrize('separator', ('', '\n', '\r\n', ' '))
+@pytest.mark.parametrize('chunk_size', (1, 7, 77, CHUNK_SIZE))
+def test_chunks_ignore_whitespace(png, separator, chunk_size):
+    data = wrap(png, separator)
+    assert b''.join(iter_base64_chunks(data, chunk_size)) == png
+
+
+@pytest.mark.parametrize('separator', ('', '\n', '\r\n'))
+def test_wrapped_base64_image_size(png, separator):
+    assert get_base64_image_size(wrap(png, separator)) == SIZE
+
+
+@pytest.mark.parametrize('data', ('не base64', 'QUJD', 'QUJ'))
+def test_invalid_base64_has_no_size(data):
+    assert get_base64_image_size(data) is None
+
+
+def test_wrapped_base64_dimensions_are_validated(png, settings):
+    settings.RECIPE_IMAGE_MAX_DIMENSION = max(SIZE) - 1
+    with pytest.raises(ImageTooLarge, match='пикселей'):
+        validate_base64_image(wrap(png, '\n'))
+
+
+def test_line_breaks_do_not_count_towards_file_size(png, settings):
+    data = wrap(png, '\r\n')
+    # Оценка размера по длине base64 с учетом выравнивания '='.
+    estimate = len(base64.b64encode(png)) * 3 // 4
+    assert len(data) * 3 // 4 > estimate
+    settings.RECIPE_IMAGE_MAX_SIZE = estimate
+    validate_base64_image(data)
+    settings.RECIPE_IMAGE_MAX_SIZE = estimate - 1
+    with pytest.raises(ImageTooLarge, match='Размер'):
+        validate_base64_image(data)
@@ -0,0 +1,79 @@
+import pytest
+
+from api.recipes.services import IngredientIndex, ingredient_index
+from recipes.models import Ingredient
+
+URL = '/api/ingredients/'
+
+
+def names(ingredients):
+    return [ingredient.name for ingredient in ingredients]
+
+
+@pytest.fixture
+def index():
+    return IngredientIndex([
+        Ingredient(id=number, name=name, unit_of_measurement='г')
+        for number, name in enumerate(
+            ('Мука', 'мускатный орех', 'МЁД', 'молоко', 'Straße', 'мёд'), 1
+        )
+    ])
+
+
+@pytest.mark.parametrize('prefix,expected', (
+    ('му', ['Мука', 'мускатный орех']),
+    ('МУ', ['Мука', 'мускатный орех']),
+    ('мё', ['МЁД', 'мёд']),
+    ('STRASS', ['Straße']),
+    ('хлеб', []),
+))
+def test_search_by_casefolded_prefix(index, prefix, expected):
+    assert names(index.search(prefix)) == expected
+
+
+def test_empty_prefix_returns_everything_sorted(index):
+    assert names(index.search('')) == [
+        'Straße', 'молоко', 'Мука', 'мускатный орех', 'МЁД', 'мёд',
+    ]
+
+
+def test_search_limit(index):
+    assert names(index.search('м', limit=2)) == ['молоко', 'Мука']
+    assert len(index.search('м')) == 5
+    assert index.search('м', limit=0) == []
+
+
+def test_by_id(index):
+    assert index.by_id[1].name == 'Мука'
+
+
+@pytest.mark.django_db
+def test_api_search_uses_index_without_queries(
+        ingredients, anon_client, settings, django_assert_num_queries):
+    settings.INGREDIENT_SEARCH_LIMIT = 1
+    anon_client.get(URL, {'name': 'м'})
+    with django_assert_num_queries(0):
+        response = anon_client.get(URL, {'name': 'М'})
+    assert [item['name'] for item in response.json()] == ['масло']
+
+
+@pytest.mark.django_db
+def test_index_refreshes_after_ingredient_change(
+        ingredients, anon_client, django_capture_on_commit_callbacks):
+    assert names(ingredient_index.get().search('кор')) == []
+    with django_capture_on_commit_callbacks(execute=True):
+        Ingredient.objects.create(name='Корица', unit_of_measurement='г')
+    assert names(ingredient_index.get().search('кор')) == ['Корица']
+
+    flour = Ingredient.objects.get(name='мука')
+    flour.name = 'Кориандр'
+    with django_capture_on_commit_callbacks(execute=True):
+        flour.save()
+    response = anon_client.get(URL, {'name': 'КОР'})
+    assert [item['name'] for item in response.json()] == [
+        'Кориандр', 'Корица'
+    ]
+    with django_capture_on_commit_callbacks(execute=True):
+        flour.delete()
+    assert names(ingredient_index.get().search('кор')) == ['Корица']
+    assert flour.id not in ingredient_index.get().by_id
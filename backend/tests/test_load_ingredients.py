@@ -0,0 +1,124 @@
+import io
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from recipes.management.commands.load_ingredients import iter_json_array
+from recipes.models import Ingredient
+
+ROWS = [
+    ('мука', 'г'), ('сахар', 'г'), ('молоко', 'мл'), ('яйца', 'шт'),
+    ('мука', 'кг'),
+]
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'ingredients.csv'
+    path.write_text(
+        ''.join(f'{name},{unit}\n' for name, unit in ROWS), encoding='utf-8'
+    )
+    return path
+
+
+@pytest.fixture
+def json_path(tmp_path):
+    path = tmp_path / 'ingredients.json'
+    path.write_text(json.dumps([
+        {'name': name, 'unit_of_measurement': unit} for name, unit in ROWS
+    ], ensure_ascii=False, indent=1), encoding='utf-8')
+    return path
+
+
+def load(path, *args):
+    out = StringIO()
+    call_command('load_ingredients', '--path', str(path), *args, stdout=out)
+    return out.getvalue()
+
+
+def stored():
+    return sorted(
+        Ingredient.objects.values_list('name', 'unit_of_measurement')
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('path', ('csv_path', 'json_path'))
+def test_load_is_idempotent(request, path):
+    path = request.getfixturevalue(path)
+    assert 'добавлено 5, пропущено 0' in load(path)
+    assert stored() == sorted(ROWS)
+    # Повторный запуск пропускает существующие (ignore_conflicts).
+    assert 'добавлено 0, пропущено 5' in load(path)
+    assert stored() == sorted(ROWS)
+
+
+@pytest.mark.django_db
+def test_json_accepts_legacy_unit_key(tmp_path):
+    path = tmp_path / 'legacy.json'
+    path.write_text(json.dumps([
+        {'name': name, 'measurement_unit': unit} for name, unit in ROWS
+    ], ensure_ascii=False), encoding='utf-8')
+    load(path)
+    assert stored() == sorted(ROWS)
+
+
+@pytest.mark.django_db
+def test_json_requires_unit(tmp_path):
+    path = tmp_path / 'broken.json'
+    path.write_text('[{"name": "мука"}]', encoding='utf-8')
+    with pytest.raises(CommandError, match='мука'):
+        load(path)
+
+
+@pytest.mark.django_db
+def test_dry_run_reads_without_writing(json_path):
+    assert 'Пробный запуск: прочитано 5 строк' in load(json_path, '--dry-run')
+    assert not Ingredient.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('batch_size,inserts', ((1, 5), (2, 3), (1000, 1)))
+def test_batch_size_sets_rows_per_insert(
+        csv_path, batch_size, inserts, django_assert_max_num_queries):
+    with django_assert_max_num_queries(20) as context:
+        load(csv_path, '--batch-size', str(batch_size))
+    assert sum(
+        query['sql'].startswith('INSERT') for query in context.captured_queries
+    ) == inserts
+    assert stored() == sorted(ROWS)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('args,message', (
+    (('--batch-size', '0'), '--batch-size'),
+    (('--path', 'ingredients.xml'), 'Неподдерживаемый формат'),
+))
+def test_invalid_arguments(csv_path, args, message):
+    with pytest.raises(CommandError, match=message):
+        call_command('load_ingredients', '--path', str(csv_path), *args)
+
+
+@pytest.mark.parametrize('chunk_size', (1, 7, 64, 1 << 16))
+def test_json_array_is_read_in_chunks(chunk_size):
+    items = [
+        {'name': f'ингредиент, "{number}"', 'unit_of_measurement': 'г'}
+        for number in range(50)
+    ]
+    text = json.dumps(items, ensure_ascii=False, indent=2)
+    file = io.StringIO(text)
+    reads = []
+    read = file.read
+    file.read = lambda size: reads.append(size) or read(size)
+
+    assert list(iter_json_array(file, chunk_size)) == items
+    assert set(reads) == {chunk_size}
+
+
+@pytest.mark.parametrize('text', ('{"name": "мука"}', '[{"name": "мука"',
+                                  '[{"name": }]'))
+def test_json_array_rejects_invalid_input(text):
+    with pytest.raises(CommandError):
+        list(iter_json_array(io.StringIO(text), 4))
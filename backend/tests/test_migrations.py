@@ -0,0 +1,70 @@
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+BEFORE = ('recipes', '0003_ingredient_search')
+# Счетчики пользователей добавлены позже 0004 и откатываются вместе с ней.
+USERS_BEFORE = ('users', '0001_initial')
+AFTER = ('recipes', '0004_ingredient_unique_name_unit')
+
+
+def migrate(targets):
+    executor = MigrationExecutor(connection)
+    executor.loader.build_graph()
+    executor.migrate(targets)
+    return executor.loader.project_state(targets).apps
+
+
+@pytest.fixture
+def migrator(transactional_db):
+    yield migrate
+    migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+
+def test_duplicate_ingredients_merge_recipe_lines(migrator):
+    apps = migrator([BEFORE, USERS_BEFORE])
+    User = apps.get_model('users', 'User')
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    author = User.objects.create(
+        username='author', email='author@example.com'
+    )
+    flour, flour_copy, other_copy = (
+        Ingredient.objects.create(name='мука', unit_of_measurement='г')
+        for _ in range(3)
+    )
+    salt = Ingredient.objects.create(name='соль', unit_of_measurement='г')
+    both = Recipe.objects.create(
+        author=author, name='оба', text='', cooking_time=1
+    )
+    copy_only = Recipe.objects.create(
+        author=author, name='копия', text='', cooking_time=1
+    )
+    for recipe, ingredient, amount in (
+        (both, flour, 100), (both, flour_copy, 50), (both, other_copy, 5),
+        (both, salt, 1), (copy_only, flour_copy, 30),
+    ):
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=amount
+        )
+        recipe.ingredients.add(ingredient)
+
+    apps = migrator([AFTER, USERS_BEFORE])
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    assert list(
+        Ingredient.objects.order_by('id').values_list('id', flat=True)
+    ) == [flour.id, salt.id]
+    lines = RecipeIngredient.objects.order_by('recipe_id', 'ingredient_id')
+    assert list(lines.values_list('recipe_id', 'ingredient_id', 'amount')) == [
+        (both.id, flour.id, 155), (both.id, salt.id, 1),
+        (copy_only.id, flour.id, 30),
+    ]
+    through = Recipe.ingredients.through.objects.order_by(
+        'recipe_id', 'ingredient_id'
+    )
+    assert list(through.values_list('recipe_id', 'ingredient_id')) == [
+        (both.id, flour.id), (both.id, salt.id), (copy_only.id, flour.id),
+    ]
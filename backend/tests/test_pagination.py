@@ -0,0 +1,188 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache, caches
+from django.core.paginator import EmptyPage
+from django.utils import timezone
+
+from api import paginators
+from api.paginators import CountStrategyPaginator
+from recipes.models import Recipe
+
+from .conftest import create_recipe
+
+LIST_URL = '/api/recipes/'
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_walks_all_recipes(anon_client, make_recipes):
+    recipes = make_recipes(7)
+    url = f'{LIST_URL}?pagination=cursor&limit=3'
+    seen = []
+    while url:
+        data = anon_client.get(url).json()
+        seen.extend(recipe['id'] for recipe in data['results'])
+        url = data['next']
+    assert seen == [recipe.id for recipe in reversed(recipes)]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('ordering', ['favorites_count', '-favorites_count',
+                                      'pub_date'])
+def test_cursor_pagination_rejects_custom_ordering(
+        anon_client, make_recipes, ordering):
+    make_recipes(3)
+    response = anon_client.get(
+        LIST_URL, {'pagination': 'cursor', 'ordering': ordering}
+    )
+    assert response.status_code == 400
+    assert 'cursor' in response.json()
+
+
+@pytest.mark.django_db
+def test_page_number_pagination_keeps_custom_ordering(
+        anon_client, make_recipes):
+    make_recipes(3)
+    response = anon_client.get(LIST_URL, {'ordering': 'pub_date'})
+    assert response.status_code == 200
+    assert response.json()['count'] == 3
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('ordering', ['-favorites_count', 'favorites_count',
+                                      'pub_date'])
+def test_page_number_pagination_is_deterministic_on_ties(
+        anon_client, make_recipes, ordering):
+    """Равные значения сортировки упорядочиваются по -pub_date, -id."""
+    recipes = make_recipes(13)
+    Recipe.objects.update(pub_date=timezone.now(), favorites_count=0)
+    Recipe.objects.filter(pk__in=[recipes[3].pk, recipes[8].pk]).update(
+        favorites_count=2
+    )
+    seen = []
+    url = f'{LIST_URL}?ordering={ordering}&limit=4'
+    while url:
+        data = anon_client.get(url).json()
+        seen.extend(recipe['id'] for recipe in data['results'])
+        url = data['next']
+    # pub_date у всех рецептов одинаковый: порядок решают счетчик и id.
+    sign = {'-favorites_count': 1, 'favorites_count': -1, 'pub_date': 0}[
+        ordering
+    ]
+    expected = sorted(
+        Recipe.objects.values_list('favorites_count', 'id'),
+        key=lambda row: (sign * row[0], row[1]), reverse=True
+    )
+    assert seen == [pk for _, pk in expected]
+
+
+class FakeCursor:
+    """Курсор PostgreSQL, возвращающий план EXPLAIN (FORMAT JSON)."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql, params):
+        self.executed.append(sql)
+
+    def fetchone(self):
+        return [json.dumps([{'Plan': {'Plan Rows': self.rows}}])]
+
+
+@pytest.mark.parametrize('vendor,expected', (('postgresql', 12345),
+                                             ('sqlite', None)))
+def test_estimated_count_reads_explain_plan(monkeypatch, vendor, expected):
+    cursor = FakeCursor(12345)
+    connection = SimpleNamespace(vendor=vendor, cursor=lambda: cursor)
+    monkeypatch.setattr(
+        paginators, 'connections', {'default': connection}
+    )
+    queryset = SimpleNamespace(db='default', query=SimpleNamespace(
+        sql_with_params=lambda: ('SELECT 1 FROM "recipes_recipe"', ())
+    ))
+    assert paginators.get_estimated_count(queryset) == expected
+    assert cursor.executed == (
+        ['EXPLAIN (FORMAT JSON) SELECT 1 FROM "recipes_recipe"']
+        if expected else []
+    )
+
+
+def count_queries(queries):
+    return sum('COUNT(' in query['sql'] for query in queries)
+
+
+@pytest.mark.django_db
+def test_sqlite_count_is_exact_and_cached(
+        make_recipes, django_assert_max_num_queries):
+    make_recipes(7)
+    for expected_queries in (1, 0):
+        paginator = CountStrategyPaginator(Recipe.objects.order_by('id'), 3)
+        with django_assert_max_num_queries(1) as context:
+            assert paginator.count == 7
+        assert count_queries(context.captured_queries) == expected_queries
+        assert paginator.count_is_estimated is False
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('estimate,estimated', ((50_000, True), (50, False)))
+def test_large_estimate_replaces_count(
+        make_recipes, monkeypatch, settings, estimate, estimated,
+        django_assert_max_num_queries):
+    settings.PAGINATOR_ESTIMATE_THRESHOLD = 10_000
+    monkeypatch.setattr(
+        paginators, 'get_estimated_count', lambda queryset: estimate
+    )
+    make_recipes(4)
+    paginator = CountStrategyPaginator(Recipe.objects.order_by('id'), 3)
+    with django_assert_max_num_queries(1) as context:
+        count = paginator.count
+    assert count == (estimate if estimated else 4)
+    assert paginator.count_is_estimated is estimated
+    assert count_queries(context.captured_queries) == int(not estimated)
+    if estimated:
+        # Оценка больше реального числа: дальние страницы пустые, не 404.
+        assert list(paginator.page(100)) == []
+    else:
+        with pytest.raises(EmptyPage):
+            paginator.page(100)
+
+
+@pytest.mark.django_db
+def test_cached_count_follows_table_changes(
+        author, user, user_client, make_recipes,
+        django_capture_on_commit_callbacks):
+    recipes = make_recipes(3)
+
+    def count(**params):
+        caches['responses'].clear()
+        return user_client.get(LIST_URL, params).json()['count']
+
+    assert count() == 3
+    assert count(is_favorited=1) == 0
+    with django_capture_on_commit_callbacks(execute=True):
+        create_recipe(author, 'Новый рецепт')
+        user_client.post(f'/api/recipes/{recipes[0].id}/favorite/')
+        user_client.post(
+            '/api/recipes/favorite/',
+            {'recipes': [recipes[1].id]}, format='json'
+        )
+    assert count() == 4
+    assert count(is_favorited=1) == 2
+    with django_capture_on_commit_callbacks(execute=True):
+        recipes[2].delete()
+    assert count() == 3
+    # Изменения без сигналов видны после PAGINATOR_COUNT_CACHE_TIMEOUT.
+    Recipe.objects.bulk_create([Recipe(
+        author=author, name='Без сигналов', text='Описание', cooking_time=1
+    )])
+    assert count() == 3
+    cache.clear()
+    assert count() == 4
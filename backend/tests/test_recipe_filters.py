@@ -0,0 +1,133 @@
+from itertools import product
+
+import pytest
+
+from recipes.models import Favorite, ShoppingCart
+
+from .conftest import create_recipe
+
+LIST_URL = '/api/recipes/'
+
+# Запросы страницы без фильтров пользователя: COUNT, рецепты,
+# теги, ингредиенты, авторы, флаги пользователя, подписки.
+SHARED_QUERIES = 7
+# С фильтром is_favorited/is_in_shopping_cart флаги входят в запрос
+# рецептов, а подписка - в запрос авторов.
+VIEWER_QUERIES = 5
+# Пустой результат: COUNT; неизвестные теги - без запросов.
+EMPTY_QUERIES = 1
+
+AUTHORS = (None, 'author', 'other')
+TAGS = ((), ('breakfast',), ('breakfast', 'dinner'), ('unknown',))
+FLAGS = (None, '1', '0')
+
+
+@pytest.fixture
+def recipes(author, other_user, user, tags, ingredients):
+    """
+    Рецепты двух авторов с разными наборами тегов;
+    часть рецептов в избранном и корзине пользователя user.
+    """
+    tag_sets = ((), tags[:1], tags[1:2], tags[1:], tags)
+    recipes = [
+        create_recipe(
+            (author, other_user)[number % 2], f'Рецепт {number}',
+            tags=tag_sets[number % len(tag_sets)],
+            ingredients=ingredients[:2],
+        )
+        for number in range(10)
+    ]
+    for recipe in recipes[::3]:
+        Favorite.objects.create(user=user, recipe=recipe)
+    for recipe in recipes[::4]:
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+    return recipes
+
+
+def expected_ids(recipes, user, author, tags, is_favorited, in_cart):
+    result = []
+    for recipe in recipes:
+        if author is not None and recipe.author_id != author.id:
+            continue
+        slugs = {tag.slug for tag in recipe.tags.all()}
+        if tags and not slugs.intersection(tags):
+            continue
+        if is_favorited == '1' and not recipe.favorite.filter(
+                user=user).exists():
+            continue
+        if in_cart == '1' and not recipe.shopping_list.filter(
+                user=user).exists():
+            continue
+        result.append(recipe.id)
+    return sorted(result, reverse=True)
+
+
+@pytest.fixture
+def uncached(settings):
+    """Без кэша ответов и кэша COUNT: каждый запрос выполняется целиком."""
+    settings.CACHES = {
+        **settings.CACHES,
+        'dummy': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    }
+    settings.RESPONSE_CACHE_ALIAS = 'dummy'
+    settings.PAGINATOR_COUNT_CACHE_TIMEOUT = 0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('author_name,tag_slugs', list(product(AUTHORS, TAGS)))
+def test_recipe_filter_matrix(
+        request, recipes, user, user_client, author_name, tag_slugs,
+        uncached, django_assert_num_queries):
+    """
+    Все сочетания фильтров: верный результат без дублей
+    и число запросов, не зависящее от сочетания.
+    """
+    author = author_name and request.getfixturevalue(
+        {'author': 'author', 'other': 'other_user'}[author_name]
+    )
+    # Первый запрос заполняет версии и справочник тегов процесса.
+    user_client.get(LIST_URL, {'limit': 1, 'tags': 'breakfast'})
+    for is_favorited, in_cart in product(FLAGS, FLAGS):
+        params = {'limit': 100}
+        if author is not None:
+            params['author'] = author.id
+        if tag_slugs:
+            params['tags'] = list(tag_slugs)
+        if is_favorited is not None:
+            params['is_favorited'] = is_favorited
+        if in_cart is not None:
+            params['is_in_shopping_cart'] = in_cart
+        expected = expected_ids(
+            recipes, user, author, tag_slugs, is_favorited, in_cart
+        )
+        if 'unknown' in tag_slugs:
+            queries = 0
+        elif not expected:
+            queries = EMPTY_QUERIES
+        elif '1' in (is_favorited, in_cart):
+            queries = VIEWER_QUERIES
+        else:
+            queries = SHARED_QUERIES
+        with django_assert_num_queries(queries):
+            response = user_client.get(LIST_URL, params)
+        assert response.status_code == 200
+        ids = [recipe['id'] for recipe in response.json()['results']]
+        assert ids == expected, params
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', ('is_favorited', 'is_in_shopping_cart'))
+@pytest.mark.parametrize('value', ('TRUE', 'tRuE', 'True', '1'))
+def test_viewer_filter_is_not_shared_between_users(
+        recipes, user, user_client, other_client, name, value):
+    """Фильтр пользователя в любом регистре не попадает в общий кэш."""
+    params = {name: value, 'limit': 100}
+    model = Favorite if name == 'is_favorited' else ShoppingCart
+    own_ids = sorted(
+        model.objects.filter(user=user).values_list('recipe_id', flat=True),
+        reverse=True
+    )
+    response = user_client.get(LIST_URL, params)
+    assert [recipe['id'] for recipe in response.json()['results']] == own_ids
+    response = other_client.get(LIST_URL, params)
+    assert response.json()['results'] == []
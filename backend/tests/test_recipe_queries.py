@@ -0,0 +1,37 @@
+import pytest
+
+from users.models import Subscription
+
+LIST_URL = '/api/recipes/'
+
+
+def count_queries(django_assert_max_num_queries, client, url):
+    with django_assert_max_num_queries(100) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries), response.json()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('viewer', ['anon_client', 'user_client'])
+def test_recipe_list_query_budget_does_not_grow_with_page_size(
+        request, viewer, make_recipes, user, author,
+        django_assert_max_num_queries):
+    """Список рецептов: число запросов не зависит от размера страницы."""
+    make_recipes(30)
+    Subscription.objects.create(user=user, author=author)
+    client = request.getfixturevalue(viewer)
+    # Первый запрос заполняет версии и справочники процесса.
+    client.get(f'{LIST_URL}?limit=2')
+    counts = {}
+    for limit in (1, 6, 30):
+        counts[limit], data = count_queries(
+            django_assert_max_num_queries, client,
+            f'{LIST_URL}?limit={limit}'
+        )
+        assert len(data['results']) == limit
+        recipe = data['results'][0]
+        assert recipe['ingredients'] and recipe['tags']
+        assert recipe['author']['is_subscribed'] is (viewer == 'user_client')
+    assert counts[1] == counts[6] == counts[30], counts
+    assert counts[30] <= 9, counts
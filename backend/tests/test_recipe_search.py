@@ -0,0 +1,74 @@
+import pytest
+
+from .conftest import create_recipe
+
+LIST_URL = '/api/recipes/'
+
+
+@pytest.fixture
+def catalog(author, tags, ingredients):
+    """Рецепты, где слово встречается в названии, описании или составе."""
+    flour, sugar, salt, eggs, milk, butter = ingredients
+    return {
+        'pancakes': create_recipe(
+            author, 'блины', text='тонкие на молоке', tags=tags[:1],
+            ingredients=(flour, eggs, milk),
+        ),
+        'omelette': create_recipe(
+            author, 'омлет', text='пышный завтрак', tags=tags[:1],
+            ingredients=(eggs, milk, salt),
+        ),
+        'cake': create_recipe(
+            author, 'торт', text='бисквит со сливками', tags=tags[2:],
+            ingredients=(flour, sugar, butter),
+        ),
+    }
+
+
+def search(client, text, **params):
+    response = client.get(LIST_URL, {'search': text, **params})
+    assert response.status_code == 200, response.content
+    return response.json()['results']
+
+
+def names(results):
+    return sorted(recipe['name'] for recipe in results)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('text,expected', (
+    ('блины', ['блины']),
+    ('завтрак', ['омлет']),
+    ('мука', ['блины', 'торт']),
+    ('моло', ['блины', 'омлет']),
+    ('борщ', []),
+))
+def test_search_matches_name_text_and_ingredients(
+        catalog, anon_client, text, expected):
+    """Без PostgreSQL поиск идет по вхождению подстроки (icontains)."""
+    assert names(search(anon_client, text)) == expected
+
+
+@pytest.mark.django_db
+def test_search_combines_with_filters_without_duplicates(
+        catalog, anon_client, tags):
+    # Рецепт с двумя подходящими ингредиентами возвращается один раз.
+    results = search(anon_client, 'мол', tags=tags[0].slug)
+    assert names(results) == ['блины', 'омлет']
+    assert names(search(anon_client, 'мука', tags=tags[2].slug)) == ['торт']
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('fast', (True, False))
+def test_headline_only_in_search_results(catalog, anon_client, settings, fast):
+    """Поле headline есть только при поиске; без PostgreSQL оно null."""
+    settings.FAST_SERIALIZERS = fast
+    assert all(
+        recipe['headline'] is None for recipe in search(anon_client, 'мука')
+    )
+    response = anon_client.get(LIST_URL)
+    assert all('headline' not in recipe for recipe in response.json()[
+        'results'
+    ])
+    recipe = anon_client.get(f'{LIST_URL}{catalog["cake"].id}/').json()
+    assert 'headline' not in recipe
@@ -0,0 +1,238 @@
+import pytest
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, ShoppingCart
+
+from .conftest import create_recipe
+
+
+@pytest.fixture
+def author_client(author):
+    client = APIClient()
+    client.force_authenticate(author)
+    return client
+
+
+@pytest.fixture
+def many_ingredients(db):
+    return [
+        Ingredient.objects.create(
+            name=f'ингредиент {number}', unit_of_measurement='г'
+        )
+        for number in range(60)
+    ]
+
+
+def replace_ingredients_queries(client, recipe, ingredients,
+                                django_assert_max_num_queries):
+    payload = {
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 5} for ingredient in ingredients
+        ],
+    }
+    with django_assert_max_num_queries(100) as context:
+        response = client.patch(
+            f'/api/recipes/{recipe.id}/', payload, format='json'
+        )
+    assert response.status_code == 200, response.data
+    assert sorted(
+        item['id'] for item in response.data['ingredients']
+    ) == sorted(ingredient.id for ingredient in ingredients)
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db
+def test_replacing_ingredients_costs_fixed_number_of_queries(
+        author, author_client, user, many_ingredients, tags,
+        django_assert_max_num_queries):
+    """Замена 5 или 30 строк ингредиентов - одинаковое число запросов."""
+    # Справочник ингредиентов процесса строится при первом обращении.
+    author_client.get('/api/ingredients/')
+    counts = {}
+    for size in (5, 30):
+        recipe = create_recipe(
+            author, f'Рецепт {size}', tags=tags,
+            ingredients=many_ingredients[:size]
+        )
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+        counts[size] = replace_ingredients_queries(
+            author_client, recipe, many_ingredients[size:2 * size],
+            django_assert_max_num_queries
+        )
+    assert counts[5] == counts[30], counts
+
+
+@pytest.mark.django_db
+def test_deleting_recipe_costs_fixed_number_of_queries(
+        author, author_client, many_ingredients, tags,
+        django_assert_max_num_queries):
+    counts = {}
+    for size in (5, 30):
+        recipe = create_recipe(
+            author, f'Рецепт {size}', tags=tags,
+            ingredients=many_ingredients[:size]
+        )
+        with django_assert_max_num_queries(100) as context:
+            response = author_client.delete(f'/api/recipes/{recipe.id}/')
+        assert response.status_code == 204
+        assert not Recipe.objects.filter(id=recipe.id).exists()
+        counts[size] = len(context.captured_queries)
+    assert counts[5] == counts[30], counts
+
+
+@pytest.mark.django_db
+def test_shopping_list_follows_ingredient_changes(
+        author, author_client, user, user_client, many_ingredients,
+        django_capture_on_commit_callbacks):
+    recipe = create_recipe(
+        author, 'Рецепт', ingredients=many_ingredients[:2]
+    )
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    url = '/api/recipes/download_shopping_cart/?format=txt'
+
+    def shopping_list():
+        return b''.join(user_client.get(url).streaming_content).decode()
+
+    assert 'ингредиент 1' in shopping_list()
+    with django_capture_on_commit_callbacks(execute=True):
+        response = author_client.patch(
+            f'/api/recipes/{recipe.id}/',
+            {'ingredients': [{'id': many_ingredients[0].id, 'amount': 5}]},
+            format='json'
+        )
+    assert response.status_code == 200
+    assert 'ингредиент 1' not in shopping_list()
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.delete(f'/api/recipes/{recipe.id}/')
+    assert 'ингредиент 0' not in shopping_list()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('full_text', (False, True))
+@pytest.mark.parametrize('method', ('patch', 'delete'))
+def test_recipe_change_queues_fixed_number_of_callbacks(
+        author, author_client, many_ingredients, method, full_text,
+        monkeypatch, django_capture_on_commit_callbacks):
+    """
+    Журнал и поисковый вектор обновляются раз на рецепт, не на строку.
+    Обновление вектора только ставится в очередь, поэтому проверяется
+    и без PostgreSQL.
+    """
+    monkeypatch.setattr(
+        'recipes.search.use_full_text_search', lambda: full_text
+    )
+    callbacks = {}
+    for size in (5, 30):
+        recipe = create_recipe(
+            author, f'Рецепт {size}', ingredients=many_ingredients[:size]
+        )
+        payload = {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 5}
+                for ingredient in many_ingredients[size:2 * size]
+            ],
+        }
+        with django_capture_on_commit_callbacks() as queued:
+            getattr(author_client, method)(
+                f'/api/recipes/{recipe.id}/', payload, format='json'
+            )
+        callbacks[size] = len(queued)
+    assert callbacks[5] == callbacks[30], callbacks
+    assert callbacks[5] <= 6, callbacks
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('method', ('post', 'patch'))
+def test_unknown_ingredient_is_rejected(
+        author, author_client, many_ingredients, tags, method):
+    """Несуществующий id ингредиента - ошибка 400, а не 500 или пропуск."""
+    recipe = create_recipe(
+        author, 'Рецепт', tags=tags[:1], ingredients=many_ingredients[:2]
+    )
+    # Ингредиент без сигналов не попадает в справочник в памяти
+    # и догружается из базы.
+    Ingredient.objects.bulk_create([
+        Ingredient(name='новый', unit_of_measurement='г')
+    ])
+    new_id = Ingredient.objects.get(name='новый').id
+    missing_id = new_id + 1000
+    payload = {
+        'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 5,
+        'tags': [tags[0].id],
+        'ingredients': [
+            {'id': new_id, 'amount': 5}, {'id': missing_id, 'amount': 5},
+        ],
+    }
+    url = '/api/recipes/'
+    if method == 'patch':
+        url = f'/api/recipes/{recipe.id}/'
+    response = getattr(author_client, method)(url, payload, format='json')
+    assert response.status_code == 400
+    assert response.json()['ingredients'] == [
+        f'Ингредиенты с id [{missing_id}] не найдены'
+    ]
+    assert Recipe.objects.count() == 1
+    assert sorted(
+        recipe.recipe_ingredients.values_list('ingredient_id', flat=True)
+    ) == [ingredient.id for ingredient in many_ingredients[:2]]
+
+
+def recipe_state(recipe):
+    recipe.refresh_from_db()
+    return (
+        recipe.name,
+        sorted(recipe.tags.values_list('id', flat=True)),
+        sorted(recipe.recipe_ingredients.values_list(
+            'ingredient_id', 'amount'
+        )),
+    )
+
+
+# Таблицы связей, которые PATCH меняет, только если поле передано.
+RELATION_TABLES = {
+    'tags': '"recipes_recipe_tags"',
+    'ingredients': '"recipes_recipeingredient"',
+}
+
+
+def writes_to(table, queries):
+    return any(
+        query['sql'].startswith(('INSERT', 'DELETE', 'UPDATE'))
+        and table in query['sql']
+        for query in queries
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('field', ('name', 'tags', 'ingredients'))
+def test_partial_update_keeps_omitted_relations(
+        author, author_client, tags, many_ingredients, field,
+        django_assert_max_num_queries):
+    """PATCH без tags или ingredients не трогает теги и ингредиенты."""
+    recipe = create_recipe(
+        author, 'Рецепт', tags=tags[:2], ingredients=many_ingredients[:3]
+    )
+    name, tag_ids, lines = recipe_state(recipe)
+    payload = {
+        'name': 'Новое название',
+        'tags': [tags[-1].id],
+        'ingredients': [{'id': many_ingredients[-1].id, 'amount': 7}],
+    }
+    with django_assert_max_num_queries(30) as context:
+        response = author_client.patch(
+            f'/api/recipes/{recipe.id}/', {field: payload[field]},
+            format='json'
+        )
+    assert response.status_code == 200, response.json()
+
+    if field == 'name':
+        name = 'Новое название'
+    elif field == 'tags':
+        tag_ids = [tags[-1].id]
+    else:
+        lines = [(many_ingredients[-1].id, 7)]
+    assert recipe_state(recipe) == (name, tag_ids, lines)
+    for relation, table in RELATION_TABLES.items():
+        assert writes_to(table, context.captured_queries) is (
+            relation == field
+        ), relation
@@ -0,0 +1,121 @@
+import csv
+import io
+import json
+from pathlib import Path
+
+import pytest
+from django.conf import settings as django_settings
+from django.core.exceptions import ImproperlyConfigured
+
+from api.recipes import renderers
+from api.recipes.renderers import PDFShoppingListRenderer
+from recipes.models import ShoppingCart
+
+from .conftest import create_recipe
+
+try:
+    import reportlab
+except ImportError:
+    reportlab = None
+
+URL = '/api/recipes/download_shopping_cart/'
+ROWS = [('мука', 'г', 200), ('сахар', 'г', 100), ('соль', 'г', 100)]
+# Шрифт из reportlab без кириллицы.
+LATIN_FONT = reportlab and str(
+    Path(reportlab.__file__).parent / 'fonts' / 'Vera.ttf'
+)
+
+
+@pytest.fixture
+def cart(author, user, ingredients):
+    flour, sugar, salt = ingredients[:3]
+    for recipe in (
+        create_recipe(author, 'Пирог', ingredients=(flour, sugar)),
+        create_recipe(author, 'Хлеб', ingredients=(flour, salt)),
+    ):
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+
+
+def download(client, file_format):
+    response = client.get(URL, {'format': file_format})
+    assert response.status_code == 200
+    assert response['Content-Disposition'] == (
+        f'attachment; filename="shop_list.{file_format}"'
+    )
+    return response, b''.join(response.streaming_content)
+
+
+@pytest.mark.django_db
+def test_txt(cart, user_client):
+    response, content = download(user_client, 'txt')
+    assert response['Content-Type'] == 'text/plain; charset=utf-8'
+    assert content.decode() == '\n'.join(
+        f'{name} ({unit}) - {amount}' for name, unit, amount in ROWS
+    )
+
+
+@pytest.mark.django_db
+def test_csv(cart, user_client):
+    response, content = download(user_client, 'csv')
+    assert response['Content-Type'] == 'text/csv; charset=utf-8'
+    assert list(csv.reader(io.StringIO(content.decode()))) == [
+        ['Ингредиент', 'Единица измерения', 'Количество'],
+        *([name, unit, str(amount)] for name, unit, amount in ROWS),
+    ]
+
+
+@pytest.mark.django_db
+def test_json_uses_api_field_names(cart, user_client):
+    response, content = download(user_client, 'json')
+    assert response['Content-Type'] == 'application/json; charset=utf-8'
+    assert json.loads(content) == [
+        {'name': name, 'unit_of_measurement': unit, 'amount': amount}
+        for name, unit, amount in ROWS
+    ]
+
+
+@pytest.mark.django_db
+def test_json_of_empty_cart(user, user_client):
+    _, content = download(user_client, 'json')
+    assert json.loads(content) == []
+
+
+def find_cyrillic_font():
+    for path in (django_settings.SHOPPING_LIST_PDF_FONT,
+                 *PDFShoppingListRenderer.font_paths):
+        if Path(path).is_file():
+            return path
+    return None
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(renderers.canvas is None, reason='нет reportlab')
+@pytest.mark.skipif(find_cyrillic_font() is None,
+                    reason='нет шрифта с кириллицей')
+def test_pdf_embeds_cyrillic_font(cart, user_client):
+    response, content = download(user_client, 'pdf')
+    assert response['Content-Type'] == 'application/pdf'
+    assert content.startswith(b'%PDF')
+    assert b'/FontFile2' in content
+    assert Path(find_cyrillic_font()).stem.encode() in content
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(renderers.canvas is None, reason='нет reportlab')
+@pytest.mark.parametrize('font', (
+    'missing.ttf', LATIN_FONT,
+))
+def test_pdf_requires_cyrillic_font(
+        cart, user_client, settings, monkeypatch, font):
+    settings.SHOPPING_LIST_PDF_FONT = font
+    monkeypatch.setattr(PDFShoppingListRenderer, 'font_paths', ())
+    with pytest.raises(ImproperlyConfigured, match='кириллицей'):
+        user_client.get(URL, {'format': 'pdf'})
+
+
+@pytest.mark.django_db
+def test_unknown_format_and_anonymous(user_client, anon_client):
+    assert user_client.get(URL, {'format': 'xml'}).status_code == 404
+    response = anon_client.get(URL, {'format': 'txt'})
+    assert response.status_code == 401
+    assert 'detail' in json.loads(response.content)
@@ -0,0 +1,55 @@
+import os
+import time
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+
+from recipes.storage import ContentHashStorage
+
+HOUR = 60 * 60
+
+
+@pytest.fixture
+def storage(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return ContentHashStorage(location=str(tmp_path))
+
+
+def make_old(path):
+    old = time.time() - 2 * HOUR
+    os.utime(path, (old, old))
+
+
+def test_duplicate_save_refreshes_file_mtime(storage):
+    name = storage.save('recipes/a.png', ContentFile(b'image'))
+    make_old(storage.path(name))
+
+    assert storage.save('recipes/b.PNG', ContentFile(b'image')) == name
+    assert os.path.getmtime(storage.path(name)) > time.time() - HOUR
+
+
+def test_duplicate_save_restores_deleted_file(storage):
+    name = storage.save('recipes/a.png', ContentFile(b'image'))
+    os.remove(storage.path(name))
+    # exists() еще видит файл, но gc_media удаляет его до os.utime().
+    answers = iter([True])
+    storage.exists = lambda name: next(answers, False)
+
+    assert storage.save('recipes/b.png', ContentFile(b'image')) == name
+    with open(storage.path(name), 'rb') as image:
+        assert image.read() == b'image'
+
+
+@pytest.mark.django_db
+def test_gc_media_keeps_re_uploaded_file(storage):
+    kept = storage.save('recipes/a.png', ContentFile(b'kept'))
+    removed = storage.save('recipes/b.png', ContentFile(b'removed'))
+    make_old(storage.path(kept))
+    make_old(storage.path(removed))
+    storage.save('recipes/c.png', ContentFile(b'kept'))
+
+    call_command('gc_media', min_age=HOUR, stdout=open(os.devnull, 'w'))
+
+    assert storage.exists(kept)
+    assert not storage.exists(removed)
@@ -0,0 +1,64 @@
+import pytest
+from django.core.cache import caches
+
+from users.models import Subscription
+
+from .conftest import create_recipe, create_user
+
+URL = '/api/users/subscriptions/'
+
+
+def subscribe(user, authors_count, recipes_count, start=0):
+    authors = []
+    for number in range(start, start + authors_count):
+        author = create_user(f'author{number}')
+        for recipe_number in range(recipes_count):
+            create_recipe(author, f'Рецепт {number}.{recipe_number}')
+        Subscription.objects.create(user=user, author=author)
+        authors.append(author)
+    return authors
+
+
+def get_subscriptions(client, **params):
+    for alias in ('default', 'responses'):
+        caches[alias].clear()
+    response = client.get(URL, params)
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', ({}, {'recipes_limit': 2}))
+def test_query_count_does_not_depend_on_authors_and_recipes(
+        user, user_client, params, django_assert_max_num_queries):
+    counts = []
+    for authors_count, recipes_count in ((2, 1), (4, 5)):
+        subscribe(user, authors_count, recipes_count, start=len(counts) * 10)
+        with django_assert_max_num_queries(8) as context:
+            get_subscriptions(user_client, limit=100, **params)
+        counts.append(len(context.captured_queries))
+    assert counts[0] == counts[1], counts
+
+
+@pytest.mark.django_db
+def test_recipes_limit_keeps_latest_recipes(user, user_client):
+    authors = subscribe(user, 3, 4)
+    numbers = {author.id: number for number, author in enumerate(authors)}
+    data = get_subscriptions(user_client, limit=100, recipes_limit=2)
+    assert data['count'] == 3
+    for item in data['results']:
+        assert item['recipes_count'] == 4
+        assert [recipe['name'] for recipe in item['recipes']] == [
+            f'Рецепт {numbers[item["id"]]}.{recipe}' for recipe in (3, 2)
+        ]
+
+    data = get_subscriptions(user_client, limit=100)
+    assert {len(item['recipes']) for item in data['results']} == {4}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('recipes_limit', ('0', '-1', 'abc'))
+def test_recipes_limit_is_validated(user_client, recipes_limit):
+    response = user_client.get(URL, {'recipes_limit': recipes_limit})
+    assert response.status_code == 400
+    assert 'recipes_limit' in response.json()
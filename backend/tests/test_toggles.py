@@ -0,0 +1,89 @@
+import threading
+from collections import Counter
+
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+from .conftest import create_recipe
+
+PARALLEL_REQUESTS = 10
+
+
+def send_in_parallel(user, method, url):
+    """Одинаковые запросы из потоков со своими соединениями с базой."""
+    barrier = threading.Barrier(PARALLEL_REQUESTS)
+    statuses = []
+
+    def send():
+        client = APIClient()
+        client.force_authenticate(user)
+        barrier.wait()
+        try:
+            statuses.append(getattr(client, method)(url).status_code)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=send) for _ in range(PARALLEL_REQUESTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return Counter(statuses)
+
+
+def toggles(recipe, author):
+    """
+    Адрес, модель и число запросов POST и DELETE: изменение связи,
+    счетчик (кроме корзины) и выборка данных ответа.
+    """
+    return (
+        (f'/api/recipes/{recipe.id}/favorite/', Favorite, {
+            'post': 3, 'delete': 2,
+        }),
+        (f'/api/recipes/{recipe.id}/shopping_cart/', ShoppingCart, {
+            'post': 2, 'delete': 1,
+        }),
+        (f'/api/users/{author.id}/subscribe/', Subscription, {
+            'post': 5, 'delete': 2,
+        }),
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_toggles_change_state_once(author, user):
+    recipe = create_recipe(author, 'Рецепт')
+    for url, model, _ in toggles(recipe, author):
+        statuses = send_in_parallel(user, 'post', url)
+        assert statuses == {201: 1, 400: PARALLEL_REQUESTS - 1}, url
+        assert model.objects.filter(user=user).count() == 1
+
+        statuses = send_in_parallel(user, 'delete', url)
+        assert statuses == {204: 1, 400: PARALLEL_REQUESTS - 1}, url
+        assert not model.objects.filter(user=user).exists()
+
+    recipe.refresh_from_db()
+    author.refresh_from_db()
+    assert recipe.favorites_count == 0
+    assert author.subscribers_count == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('method,status', (('post', 201), ('delete', 204)))
+def test_toggle_query_count(
+        author, user, user_client, method, status, django_assert_num_queries):
+    recipe = create_recipe(author, 'Рецепт')
+    for url, _, queries in toggles(recipe, author):
+        if method == 'delete':
+            user_client.post(url)
+        with django_assert_num_queries(queries[method]):
+            assert getattr(user_client, method)(url).status_code == status
+    assert Recipe.objects.get(pk=recipe.pk).favorites_count == (
+        1 if method == 'post' else 0
+    )
+    assert User.objects.get(pk=author.pk).subscribers_count == (
+        1 if method == 'post' else 0
+    )
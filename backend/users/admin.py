@@ -11,6 +11,8 @@ class UserAdmin(admin.ModelAdmin):
         'email',
         'first_name',
         'last_name',
+        'recipes_count',
+        'subscribers_count',
         # 'password',
     )
     list_filter = ('username', 'email',)